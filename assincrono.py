@@ -0,0 +1,371 @@
+"""Modo assíncrono (ASGI) para as rotas de leitura.
+
+    uvicorn --factory 'assincrono:criar_app_asgi' --workers 4 --port 8000
+
+O app Flask continua síncrono; este módulo o embrulha num app ASGI. GET/HEAD
+das rotas de leitura (listas, relatórios, busca e JSON) rodam como
+`async def` numa AsyncSession sobre os mesmos modelos: enquanto uma consulta
+espera o banco o loop atende outras conexões, em vez de prender uma thread
+por requisição. Consultas independentes da mesma página rodam juntas
+(asyncio.gather), cada uma com sua conexão do pool.
+
+O resto vai para o app Flask num pool de ASSINCRONO_THREADS threads: POST,
+telas de edição e qualquer requisição com cookie de sessão (pode ter flash
+ou tarefa a avisar). A resposta encaminhada é acumulada antes de enviar.
+URLs, templates e o cache de páginas são os mesmos do modo síncrono.
+
+Os hooks before/after_request do Flask só rodam nas requisições
+encaminhadas. Nas rotas async, portanto:
+- não há métricas: sem g._metricas, /metrics e X-SQL-* não contam essas
+  requisições nem as consultas delas;
+- não há roteamento para réplicas: tudo lê de ASSINCRONO_DATABASE_URI. Quem
+  está na janela de leitura do primário (cookie primario_ate) é encaminhado,
+  assim como quem tem sessão;
+- não há aviso de tarefas (quem enfileirou tem sessão e é encaminhado).
+
+Dependências opcionais: um servidor ASGI (uvicorn) e o driver assíncrono do
+banco (aiosqlite, aiomysql ou asyncpg; ver banco.DRIVERS_ASSINCRONOS).
+"""
+import asyncio
+import io
+import sys
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import abort, copy_current_request_context, jsonify, render_template, request
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, sessionmaker
+from werkzeug.exceptions import HTTPException
+from werkzeug.http import parse_cookie
+
+import ecommerce
+from banco import criar_engine_assincrono
+from replicas import COOKIE as COOKIE_PRIMARIO
+from ecommerce import (
+    DIMENSOES_VENDA, ORDENS_ANUNCIO, PERIODOS, Anuncio, Categoria, Compra, ListaApi, Pergunta, Usuario,
+    agrupar_facetas, args_busca, consulta_anuncios_prefixo, consulta_api_obter, consulta_categorias,
+    consulta_facetas, consulta_keyset, consulta_resumo, consulta_usuarios_prefixo, contagens_categoria,
+    dimensao_pedida, fechar_pagina, filtros_categoria, json_anuncios, json_usuarios, montar_categorias,
+    ordenar_resultados, paginas, periodo_pedido, ranquear_busca, resposta_api_obter,
+)
+
+ROTAS = {}  # endpoint do app Flask -> handler async que atende o GET
+engine = None
+Sessao = None
+_threads = None
+
+
+def criar_app_asgi(config=None):
+    """Entrada para servidores ASGI: `uvicorn --factory 'assincrono:criar_app_asgi'`."""
+    global engine, Sessao, _threads
+    app = ecommerce.create_app(config)
+    engine = criar_engine_assincrono(app.config)
+    Sessao = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    _threads = ThreadPoolExecutor(app.config["ASSINCRONO_THREADS"], thread_name_prefix="wsgi")
+    return AppAsgi(app)
+
+
+def leitura(endpoint):
+    """Registra o handler como a versão async do GET de `endpoint` (mesma URL do Flask)."""
+    def decorador(handler):
+        ROTAS[endpoint] = handler
+        return handler
+    return decorador
+
+
+# =========================
+#      SERVIDOR ASGI
+# =========================
+
+class AppAsgi:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            return await self._ciclo_de_vida(receive, send)
+        if scope["type"] != "http":
+            return  # sem websockets
+        environ = _environ(scope, await _ler_corpo(receive))
+        handler, args = self._rota(environ)
+        if handler is None:
+            status, cabecalhos, corpo = await asyncio.get_running_loop().run_in_executor(
+                _threads, _coletar, self.app, environ)
+        else:
+            status, cabecalhos, corpo = await self._atender(handler, args, environ)
+        await send({"type": "http.response.start", "status": status,
+                    "headers": [(k.lower().encode("latin1"), v.encode("latin1")) for k, v in cabecalhos]})
+        await send({"type": "http.response.body", "body": corpo})
+
+    def _rota(self, environ):
+        cookies = parse_cookie(environ)
+        if environ["REQUEST_METHOD"] not in ("GET", "HEAD") \
+                or self.app.config["SESSION_COOKIE_NAME"] in cookies or COOKIE_PRIMARIO in cookies:
+            return None, None
+        try:
+            endpoint, args = self.app.url_map.bind_to_environ(environ).match()
+        except HTTPException:
+            return None, None  # 404, 405, redirect de barra final: o Flask responde
+        return ROTAS.get(endpoint), args
+
+    async def _atender(self, handler, args, environ):
+        # o contexto da requisição fica numa ContextVar: cada task do loop tem o seu
+        with self.app.request_context(environ):
+            try:
+                resposta = self.app.make_response(await handler(**args))
+            except Exception as e:
+                resposta = self.app.make_response(self._erro(e))
+            return _coletar(resposta, environ)
+
+    def _erro(self, e):
+        # mesmos errorhandlers (ErroApi, 404...) das views síncronas
+        try:
+            return self.app.handle_user_exception(e)
+        except Exception as e:
+            return self.app.handle_exception(e)
+
+    async def _ciclo_de_vida(self, receive, send):
+        while True:
+            mensagem = await receive()
+            if mensagem["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif mensagem["type"] == "lifespan.shutdown":
+                await engine.dispose()
+                _threads.shutdown(wait=True)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+
+async def _ler_corpo(receive):
+    partes = []
+    while True:
+        mensagem = await receive()
+        if mensagem["type"] == "http.disconnect":
+            break
+        partes.append(mensagem.get("body", b""))
+        if not mensagem.get("more_body"):
+            break
+    return b"".join(partes)
+
+
+def _environ(scope, corpo):
+    """Environ WSGI equivalente ao scope HTTP do ASGI."""
+    servidor = scope.get("server") or ("localhost", 80)
+    raiz = scope.get("root_path", "")
+    caminho = scope["path"]
+    if raiz and caminho.startswith(raiz):
+        caminho = caminho[len(raiz):]
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": raiz.encode().decode("latin1"),
+        "PATH_INFO": caminho.encode().decode("latin1"),
+        "QUERY_STRING": scope["query_string"].decode("latin1"),
+        "SERVER_NAME": servidor[0],
+        "SERVER_PORT": str(servidor[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": (scope.get("client") or ("",))[0],
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(corpo),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    for nome, valor in scope["headers"]:
+        nome, valor = nome.decode("latin1").upper().replace("-", "_"), valor.decode("latin1")
+        chave = nome if nome in ("CONTENT_TYPE", "CONTENT_LENGTH") else "HTTP_" + nome
+        if chave in environ:
+            valor = environ[chave] + ("; " if chave == "HTTP_COOKIE" else ",") + valor
+        environ[chave] = valor
+    environ.setdefault("CONTENT_LENGTH", str(len(corpo)))  # corpo já lido inteiro (vale para chunked)
+    return environ
+
+
+def _coletar(app_wsgi, environ):
+    """Roda um app WSGI (o Flask ou uma Response) até o fim: (status, cabeçalhos, corpo)."""
+    saida = {}
+
+    def start_response(status, cabecalhos, exc_info=None):
+        saida["status"], saida["cabecalhos"] = int(status.split(" ", 1)[0]), cabecalhos
+
+    partes = app_wsgi(environ, start_response)
+    try:
+        corpo = b"".join(partes)
+    finally:
+        if hasattr(partes, "close"):
+            partes.close()
+    return saida["status"], saida["cabecalhos"], corpo
+
+
+# =========================
+#    CONSULTAS (ASYNC)
+# =========================
+# Cada chamada usa a própria AsyncSession, então várias podem rodar em gather.
+# expire_on_commit=False: os objetos seguem legíveis no template depois de fechada.
+
+async def objetos(consulta):
+    async with Sessao() as sessao:
+        return (await sessao.execute(consulta)).scalars().all()
+
+async def primeiro(consulta):
+    async with Sessao() as sessao:
+        return (await sessao.execute(consulta)).scalars().first()
+
+async def linhas(consulta):
+    async with Sessao() as sessao:
+        return (await sessao.execute(consulta)).all()
+
+async def linha(consulta):
+    async with Sessao() as sessao:
+        return (await sessao.execute(consulta)).first()
+
+async def paginar(consulta, coluna_id, **opcoes):
+    """paginar_keyset() sem streaming: a página inteira vem numa consulta."""
+    consulta, pagina = consulta_keyset(consulta, coluna_id, **opcoes)
+    return fechar_pagina(await objetos(consulta), pagina), pagina
+
+async def listar_categorias():
+    # mesma chave de ecommerce.listar_categorias: as invalidações valem para os dois modos
+    valor = ecommerce.cache.get("lista:categorias")
+    if valor is None:
+        valor = montar_categorias(await linhas(consulta_categorias()))
+        ecommerce.cache.set("lista:categorias", valor)
+    return valor
+
+async def em_thread(funcao, *args):
+    """Código síncrono (índice de busca) fora do loop, com o contexto da requisição."""
+    return await asyncio.get_running_loop().run_in_executor(
+        _threads, copy_current_request_context(funcao), *args)
+
+
+# =========================
+#          ROTAS
+# =========================
+
+@leitura("usuario")
+@paginas.em_cache_async("usuario")
+async def usuario():
+    usuarios, pagina = await paginar(select(Usuario).filter_by(excluido_em=None), Usuario.id)
+    return render_template("user.html", titulo="Usuário", usuarios=usuarios, pagina=pagina)
+
+@leitura("categoria")
+@paginas.em_cache_async("categoria")
+async def categoria():
+    categorias = await objetos(select(Categoria).order_by(Categoria.id.desc()))
+    return render_template("categoria.html", categorias=categorias, titulo="Categoria")
+
+@leitura("categoria_anuncios")
+@paginas.em_cache_async("anuncio", "categoria", "faceta_categoria")
+async def categoria_anuncios(id):
+    consulta, paginacao, contexto = filtros_categoria(select(Anuncio), id)
+    c, (lista_anuncios, pagina), contagens, categorias = await asyncio.gather(
+        primeiro(select(Categoria).filter_by(id=id)),
+        paginar(consulta, Anuncio.id, **paginacao),
+        linhas(consulta_facetas()),
+        listar_categorias(),
+    )
+    if c is None:
+        abort(404)
+    return render_template("categoria_anuncios.html", titulo=c.nome, categoria=c, anuncios=lista_anuncios,
+                           pagina=pagina, categorias=categorias,
+                           **contexto, **contagens_categoria(id, agrupar_facetas(contagens)))
+
+@leitura("anuncios")
+@paginas.em_cache_async("anuncio", "categoria")
+async def anuncios():
+    ordem = request.args.get("ordem")
+    (lista_anuncios, pagina), categorias = await asyncio.gather(
+        paginar(select(Anuncio).filter_by(excluido_em=None), Anuncio.id,
+                coluna_ordem=ORDENS_ANUNCIO.get(ordem)),
+        listar_categorias(),
+    )
+    return render_template("anuncios.html", titulo="Anúncio", pagina=pagina, ordem=ordem,
+                           anuncios=lista_anuncios, categorias=categorias)
+
+@leitura("pergunta")
+@paginas.em_cache_async("pergunta", "anuncio", "usuario")
+async def pergunta():
+    perguntas, pagina = await paginar(
+        select(Pergunta).options(
+            joinedload(Pergunta.anuncio).load_only(Anuncio.titulo),
+            joinedload(Pergunta.usuario).load_only(Usuario.nome),
+        ),
+        Pergunta.id,
+    )
+    return render_template("pergunta.html", perguntas=perguntas, pagina=pagina)
+
+@leitura("anuncio_perguntas")
+@paginas.em_cache_async("pergunta", "anuncio", "usuario")
+async def anuncio_perguntas(id):
+    a, (perguntas, pagina) = await asyncio.gather(
+        primeiro(select(Anuncio).filter_by(id=id, excluido_em=None)),
+        paginar(select(Pergunta).filter_by(anuncio_id=id)
+                .options(joinedload(Pergunta.usuario).load_only(Usuario.nome)),
+                Pergunta.id, coluna_ordem=Pergunta.criado_em, crescente=True),
+    )
+    if a is None:
+        abort(404)
+    return render_template("anuncio_perguntas.html", anuncio=a, perguntas=perguntas, pagina=pagina)
+
+@leitura("compra")
+async def compra():
+    compras, pagina = await paginar(
+        select(Compra).options(
+            joinedload(Compra.anuncio).load_only(Anuncio.titulo),
+            joinedload(Compra.usuario).load_only(Usuario.nome),
+        ),
+        Compra.id,
+    )
+    return render_template("compra.html", compras=compras, pagina=pagina,
+                           chave_idempotencia=uuid.uuid4().hex)
+
+@leitura("busca")
+@paginas.em_cache_async("anuncio", "categoria")
+async def busca():
+    args = args_busca()
+    ranking, categorias = await asyncio.gather(em_thread(ranquear_busca, args), listar_categorias())
+    resultados = []
+    if ranking:
+        anuncios = await objetos(select(Anuncio).where(Anuncio.id.in_([i for i, _ in ranking])))
+        resultados = ordenar_resultados(ranking, anuncios)
+    return render_template("busca.html", resultados=resultados, categorias=categorias, **args)
+
+@leitura("relVendas")
+@paginas.em_cache_async("resumo_venda", "anuncio", "categoria", "usuario")
+async def relVendas():
+    dimensao, periodo = dimensao_pedida(), periodo_pedido()
+    return render_template("relVendas.html", linhas=await linhas(consulta_resumo(dimensao, periodo)),
+                           dimensao=dimensao, periodo=periodo, dimensoes=DIMENSOES_VENDA, periodos=PERIODOS)
+
+@leitura("relCompras")
+@paginas.em_cache_async("resumo_venda", "usuario")
+async def relCompras():
+    periodo = periodo_pedido()
+    return render_template("relCompras.html", linhas=await linhas(consulta_resumo("comprador", periodo)),
+                           periodo=periodo, periodos=PERIODOS)
+
+@leitura("buscar_usuarios")
+async def buscar_usuarios():
+    consulta = consulta_usuarios_prefixo()
+    return jsonify(json_usuarios(await linhas(consulta)) if consulta is not None else [])
+
+@leitura("buscar_anuncios")
+async def buscar_anuncios():
+    consulta = consulta_anuncios_prefixo()
+    return jsonify(json_anuncios(await linhas(consulta)) if consulta is not None else [])
+
+@leitura("api_listar")
+async def api_listar(recurso):
+    lista = ListaApi(recurso)
+    if lista.condicional:
+        resposta = lista.nao_modificada(await linhas(lista.versoes()))
+        if resposta is not None:
+            return resposta
+    return lista.resposta(await linhas(lista.pagina()))
+
+@leitura("api_obter")
+async def api_obter(recurso, id):
+    campos, consulta = consulta_api_obter(recurso, id)
+    return resposta_api_obter(id, campos, await linha(consulta))
@@ -0,0 +1,179 @@
+"""Configuração do engine a partir da config do app, com pool instrumentado.
+
+Suporta qualquer URL do SQLAlchemy (MySQL em produção) e um modo SQLite de
+primeira classe: arquivo com WAL para rodar o app e os benchmarks numa
+máquina só, ou `sqlite://` em memória (uma conexão compartilhada).
+
+criar_engine_assincrono() monta o engine do modo ASGI (assincrono.py) com a
+mesma config, trocando o driver pelo equivalente assíncrono.
+"""
+import sqlite3
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool, StaticPool
+from sqlalchemy.schema import CreateIndex
+
+# driver síncrono -> assíncrono (aiosqlite, aiomysql e asyncpg são dependências opcionais)
+DRIVERS_ASSINCRONOS = {
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+    "mysql": "mysql+aiomysql",
+    "mysql+pymysql": "mysql+aiomysql",
+    "mysql+mysqldb": "mysql+aiomysql",
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+}
+
+
+class PoolMedido(QueuePool):
+    """QueuePool que mede a espera por conexão (checkout) e os timeouts."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._lock_metricas = threading.Lock()
+        self.checkouts = 0
+        self.espera_total = 0.0
+        self.espera_max = 0.0
+        self.timeouts = 0
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeout:
+            with self._lock_metricas:
+                self.timeouts += 1
+            raise
+        finally:
+            espera = time.perf_counter() - inicio
+            with self._lock_metricas:
+                self.checkouts += 1
+                self.espera_total += espera
+                self.espera_max = max(self.espera_max, espera)
+
+
+class PoolMedidoAssincrono(PoolMedido, AsyncAdaptedQueuePool):
+    """PoolMedido com a fila do asyncio (exigida por create_async_engine)."""
+
+
+def eh_sqlite_memoria(uri):
+    return uri in ("sqlite://", "sqlite:///:memory:") or "mode=memory" in uri
+
+
+def opcoes_engine(config):
+    """Monta SQLALCHEMY_ENGINE_OPTIONS a partir das chaves DB_* da config."""
+    uri = config["SQLALCHEMY_DATABASE_URI"]
+    if uri.startswith("sqlite"):
+        if eh_sqlite_memoria(uri):
+            # um único banco em memória visível por todas as threads
+            return {"poolclass": StaticPool, "connect_args": {"check_same_thread": False}}
+        return {
+            "poolclass": PoolMedido,
+            "pool_size": config["DB_POOL_SIZE"],
+            "max_overflow": config["DB_MAX_OVERFLOW"],
+            "pool_timeout": config["DB_POOL_TIMEOUT"],
+            "connect_args": {"check_same_thread": False, "timeout": config["SQLITE_BUSY_TIMEOUT"]},
+        }
+    return {
+        "poolclass": PoolMedido,
+        "pool_size": config["DB_POOL_SIZE"],
+        "max_overflow": config["DB_MAX_OVERFLOW"],
+        "pool_timeout": config["DB_POOL_TIMEOUT"],
+        "pool_recycle": config["DB_POOL_RECYCLE"],
+        "pool_pre_ping": config["DB_POOL_PRE_PING"],
+    }
+
+
+def url_assincrona(uri):
+    """A URL com o driver assíncrono equivalente (ver DRIVERS_ASSINCRONOS)."""
+    url = make_url(uri)
+    if url.drivername in DRIVERS_ASSINCRONOS.values():
+        return url
+    if url.drivername not in DRIVERS_ASSINCRONOS:
+        raise ValueError(f"sem driver assíncrono conhecido para {url.drivername}; "
+                         "defina ASSINCRONO_DATABASE_URI")
+    return url.set(drivername=DRIVERS_ASSINCRONOS[url.drivername])
+
+
+def criar_engine_assincrono(config):
+    """AsyncEngine de ASSINCRONO_DATABASE_URI (ou SQLALCHEMY_DATABASE_URI com driver trocado)."""
+    uri = config.get("ASSINCRONO_DATABASE_URI") or config["SQLALCHEMY_DATABASE_URI"]
+    if eh_sqlite_memoria(uri):
+        raise ValueError("o modo assíncrono precisa de um banco compartilhado (SQLite em memória não serve)")
+    url = url_assincrona(uri)
+    opcoes = {
+        "poolclass": PoolMedidoAssincrono,
+        "pool_size": config["DB_POOL_SIZE"],
+        "max_overflow": config["DB_MAX_OVERFLOW"],
+        "pool_timeout": config["DB_POOL_TIMEOUT"],
+    }
+    if url.get_backend_name() == "sqlite":
+        opcoes["connect_args"] = {"timeout": config["SQLITE_BUSY_TIMEOUT"]}
+    else:
+        opcoes.update(pool_recycle=config["DB_POOL_RECYCLE"], pool_pre_ping=config["DB_POOL_PRE_PING"])
+    engine = create_async_engine(url, **opcoes)
+    if url.get_backend_name() == "sqlite":
+        # o adaptador do aiosqlite não é um sqlite3.Connection: os pragmas vêm daqui
+        event.listen(engine.sync_engine, "connect", _pragmas)
+    return engine
+
+
+@event.listens_for(Engine, "connect")
+def _pragmas_sqlite(dbapi_connection, connection_record):
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        _pragmas(dbapi_connection, connection_record)
+
+
+def _pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA foreign_keys=ON")
+    # WAL: leitores não bloqueiam o escritor (não se aplica a :memory:)
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
+
+
+@compiles(CreateIndex, "sqlite")
+def _indice_nocase(create, compiler, **kw):
+    """Índices com info={"nocase": True} saem com COLLATE NOCASE no SQLite.
+
+    Lá o LIKE ignora maiúsculas e só usa índice de collation NOCASE (busca por
+    prefixo, 'q%'). No MySQL a collation _ci da coluna já faz isso com o
+    índice comum, que é o que os outros dialetos geram.
+    """
+    indice = create.element
+    if not indice.info.get("nocase"):
+        return compiler.visit_create_index(create, **kw)
+    preparer = compiler.preparer
+    colunas = ", ".join(f"{preparer.quote(c.name)} COLLATE NOCASE" for c in indice.columns)
+    return (f"CREATE {'UNIQUE ' if indice.unique else ''}INDEX {preparer.format_index(indice)} "
+            f"ON {preparer.format_table(indice.table)} ({colunas})")
+
+
+def status_pool(engine):
+    """Ocupação e espera do pool do engine, para dimensionar contra o nº de workers."""
+    pool = engine.pool
+    dados = {"classe": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        dados.update({
+            "tamanho": pool.size(),
+            "em_uso": pool.checkedout(),
+            "ociosas": pool.checkedin(),
+            "overflow": pool.overflow(),
+            "timeout": pool.timeout(),
+        })
+    if isinstance(pool, PoolMedido):
+        dados.update({
+            "checkouts": pool.checkouts,
+            "espera_total_s": round(pool.espera_total, 6),
+            "espera_media_ms": round(1000 * pool.espera_total / pool.checkouts, 3) if pool.checkouts else 0.0,
+            "espera_max_ms": round(1000 * pool.espera_max, 3),
+            "timeouts": pool.timeouts,
+        })
+    return dados
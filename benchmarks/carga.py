@@ -0,0 +1,157 @@
+"""Gerador de carga HTTP multiprocesso contra um servidor já rodando.
+
+Uso:
+    gunicorn -w 4 -b 127.0.0.1:8000 'ecommerce:create_app()' &
+    python benchmarks/carga.py --url http://127.0.0.1:8000 --processos 4 --conexoes 16 \\
+        --duracao 30 --pid $(pgrep -o gunicorn) --saida carga.json \\
+        --cookie "session=..." /cad/anuncios /anuncios/compra "/busca?q=camera" \\
+        "POST /anuncios/compra anuncio_id=1&quantidade=1"
+
+Compras, perguntas e cadastro de anúncios são de quem está logado: para os
+POSTs, passe em --cookie o cookie de sessão de um login (sem ele a resposta
+é o redirecionamento para /login; com ele as páginas não vêm do cache).
+
+Cada processo abre `--conexoes` threads com keep-alive e percorre as rotas em
+rodízio. Com --pid, amostra o pico de RSS (VmHWM) do servidor e dos filhos.
+"""
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from estatisticas import resumir  # noqa: E402
+
+
+def _parse_rota(spec):
+    partes = spec.split(" ", 2)
+    if partes[0] in ("GET", "POST"):
+        return partes[0], partes[1], (partes[2] if len(partes) > 2 else "")
+    return "GET", spec, ""
+
+
+def _conexao(url, latencias, erros, rotas, fim, deslocamento, cookie):
+    alvo = urlsplit(url)
+    classe = http.client.HTTPSConnection if alvo.scheme == "https" else http.client.HTTPConnection
+    conexao = classe(alvo.hostname, alvo.port)
+    i = deslocamento
+    while time.perf_counter() < fim:
+        metodo, caminho, corpo = rotas[i % len(rotas)]
+        i += 1
+        cabecalhos = {"Content-Type": "application/x-www-form-urlencoded"} if metodo == "POST" else {}
+        if cookie:
+            cabecalhos["Cookie"] = cookie
+        t0 = time.perf_counter()
+        try:
+            conexao.request(metodo, caminho, body=corpo or None, headers=cabecalhos)
+            resposta = conexao.getresponse()
+            resposta.read()
+            ok = resposta.status < 400
+        except (OSError, http.client.HTTPException):
+            conexao.close()
+            conexao = classe(alvo.hostname, alvo.port)
+            ok = False
+        chave = f"{metodo} {caminho}"
+        latencias.setdefault(chave, []).append(time.perf_counter() - t0)
+        if not ok:
+            erros[chave] = erros.get(chave, 0) + 1
+
+
+def _processo(url, rotas, conexoes, inicio, duracao, fila, numero, cookie=None):
+    while time.time() < inicio:
+        time.sleep(0.001)
+    fim = time.perf_counter() + duracao
+    latencias, erros = {}, {}
+    threads = [threading.Thread(target=_conexao, args=(url, latencias, erros, rotas, fim, numero * conexoes + n,
+                                                           cookie))
+               for n in range(conexoes)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    fila.put((latencias, erros))
+
+
+def _pico_rss_mb(pid):
+    """VmHWM do processo e dos filhos diretos (workers do gunicorn)."""
+    pids = [pid]
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            pids += [int(p) for p in f.read().split()]
+    except OSError:
+        pass
+    total = 0
+    for p in pids:
+        try:
+            with open(f"/proc/{p}/status") as f:
+                for linha in f:
+                    if linha.startswith("VmHWM:"):
+                        total += int(linha.split()[1])
+        except OSError:
+            pass
+    return round(total / 1024, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("rotas", nargs="+", help='"/caminho" ou "POST /caminho corpo-urlencoded"')
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--processos", type=int, default=os.cpu_count())
+    parser.add_argument("--conexoes", type=int, default=8, help="conexões por processo")
+    parser.add_argument("--duracao", type=float, default=30.0, help="segundos")
+    parser.add_argument("--pid", type=int, help="pid do servidor, para medir RSS")
+    parser.add_argument("--saida", help="arquivo JSON de resultado")
+    parser.add_argument("--cookie", help="cabeçalho Cookie enviado em todas as requisições (sessão logada)")
+    args = parser.parse_args()
+
+    rotas = [_parse_rota(r) for r in args.rotas]
+    fila = multiprocessing.Queue()
+    inicio = time.time() + 0.5
+    processos = [multiprocessing.Process(target=_processo,
+                                         args=(args.url, rotas, args.conexoes, inicio, args.duracao, fila, n,
+                                               args.cookie))
+                 for n in range(args.processos)]
+    for p in processos:
+        p.start()
+    latencias, erros = {}, {}
+    for _ in processos:
+        lat, err = fila.get()
+        for chave, valores in lat.items():
+            latencias.setdefault(chave, []).extend(valores)
+        for chave, n in err.items():
+            erros[chave] = erros.get(chave, 0) + n
+    for p in processos:
+        p.join()
+
+    resultados = {chave: resumir(valores, args.duracao, erros.get(chave, 0))
+                  for chave, valores in sorted(latencias.items())}
+    todas = [v for valores in latencias.values() for v in valores]
+    resultados["(total)"] = resumir(todas, args.duracao, sum(erros.values()))
+    pico = _pico_rss_mb(args.pid) if args.pid else None
+
+    print(f"{'rota':40} {'n':>7} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'erros':>6}")
+    for chave, r in resultados.items():
+        print(f"{chave[:40]:40} {r['n']:>7} {r['req_s']:>8} {r['p50_ms']:>8} {r['p95_ms']:>8} "
+              f"{r['p99_ms']:>8} {r['erros']:>6}")
+    if pico is not None:
+        print(f"pico de RSS do servidor: {pico} MB")
+
+    if args.saida:
+        with open(args.saida, "w") as f:
+            json.dump({
+                "meta": {"data": datetime.now().isoformat(timespec="seconds"), "url": args.url,
+                         "processos": args.processos, "conexoes": args.conexoes,
+                         "duracao": args.duracao, "modo": "http", "pico_rss_servidor_mb": pico},
+                "rotas": resultados,
+            }, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""Compara dois resultados JSON (de rotas.py ou carga.py) rota a rota.
+
+Uso:
+    python benchmarks/comparar.py antes.json depois.json [--limiar 10]
+
+Marca com "!" as rotas cujo p99 piorou mais que --limiar por cento.
+"""
+import argparse
+import json
+
+
+def _variacao(antes, depois):
+    if not antes:
+        return None
+    return 100.0 * (depois - antes) / antes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("antes")
+    parser.add_argument("depois")
+    parser.add_argument("--limiar", type=float, default=10.0, help="%% de piora no p99 para alertar")
+    args = parser.parse_args()
+
+    with open(args.antes) as f:
+        antes = json.load(f)
+    with open(args.depois) as f:
+        depois = json.load(f)
+
+    print(f"antes : {antes['meta'].get('commit')} {antes['meta'].get('data')}")
+    print(f"depois: {depois['meta'].get('commit')} {depois['meta'].get('data')}")
+    print(f"{'rota':32} {'p50 ms':>17} {'p99 ms':>17} {'req/s':>15}")
+    pioras = 0
+    for rota in sorted(set(antes["rotas"]) | set(depois["rotas"])):
+        a, d = antes["rotas"].get(rota), depois["rotas"].get(rota)
+        if not a or not d or "falha" in a or "falha" in d:
+            print(f"{rota:32} (ausente ou com falha em um dos lados)")
+            continue
+        colunas = []
+        for chave in ("p50_ms", "p99_ms", "req_s"):
+            v = _variacao(a[chave], d[chave])
+            colunas.append(f"{d[chave]:>8} ({v:+5.0f}%)" if v is not None else f"{d[chave]:>8}   (n/a)")
+        piorou = (_variacao(a["p99_ms"], d["p99_ms"]) or 0) > args.limiar
+        pioras += piorou
+        print(f"{rota:32} {colunas[0]:>17} {colunas[1]:>17} {colunas[2]:>15}{' !' if piorou else ''}")
+    print(f"{pioras} rota(s) com p99 pior que {args.limiar:.0f}%")
+
+
+if __name__ == "__main__":
+    main()
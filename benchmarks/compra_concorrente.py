@@ -0,0 +1,109 @@
+"""Benchmark de concorrência da compra: muitos compradores num único anúncio.
+
+Dispara `--compradores` threads, cada uma fazendo `--tentativas` POSTs em
+/anuncios/compra para o mesmo anuncio_id (estoque limitado). Uma fração das
+requisições é reenviada com a mesma chave de idempotência, simulando retry.
+
+Uso:
+    python benchmarks/compra_concorrente.py --db sqlite:////tmp/bench_compra.db \\
+        --compradores 500 --estoque 1000 --tentativas 4
+
+Relata vazão, compras gravadas, oversell (unidades vendidas além do estoque)
+e duplicatas (compras gravadas a mais por causa dos reenvios).
+"""
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ecommerce import create_app, db, Anuncio, Categoria, Compra, Usuario  # noqa: E402
+
+
+def preparar(estoque):
+    db.drop_all()
+    db.create_all()
+    vendedor = Usuario(nome="Vendedor", email="vendedor@bench", senha="x")
+    comprador = Usuario(nome="Comprador", email="comprador@bench", senha="x")
+    categoria = Categoria(nome="Bench")
+    db.session.add_all([vendedor, comprador, categoria])
+    db.session.flush()
+    anuncio = Anuncio(titulo="Oferta relâmpago", preco=Decimal("9.90"), estoque=estoque,
+                      categoria_id=categoria.id, usuario_id=vendedor.id)
+    db.session.add(anuncio)
+    db.session.commit()
+    return anuncio.id, comprador.id
+
+
+def comprador(app, anuncio_id, usuario_id, tentativas, reenvio, latencias, inicio):
+    cliente = app.test_client()
+    with cliente.session_transaction() as sessao:
+        sessao["usuario_id"] = usuario_id  # a compra é de quem está logado
+    inicio.wait()
+    for _ in range(tentativas):
+        chave = uuid.uuid4().hex
+        envios = 2 if random.random() < reenvio else 1
+        for _ in range(envios):
+            t0 = time.perf_counter()
+            cliente.post("/anuncios/compra", data={
+                "anuncio_id": anuncio_id, "quantidade": 1, "chave_idempotencia": chave,
+            })
+            latencias.append(time.perf_counter() - t0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default="sqlite:////tmp/bench_compra.db")
+    parser.add_argument("--compradores", type=int, default=500)
+    parser.add_argument("--tentativas", type=int, default=4, help="compras por comprador")
+    parser.add_argument("--estoque", type=int, default=1000)
+    parser.add_argument("--reenvio", type=float, default=0.25,
+                        help="fração das compras reenviadas com a mesma chave")
+    args = parser.parse_args()
+
+    # pool do tamanho da concorrência, para medir o banco e não a fila do pool
+    app = create_app({"SQLALCHEMY_DATABASE_URI": args.db, "DB_POOL_SIZE": args.compradores,
+                      "SQLITE_BUSY_TIMEOUT": 60})
+
+    with app.app_context():
+        anuncio_id, usuario_id = preparar(args.estoque)
+
+    latencias, inicio = [], threading.Event()
+    threads = [
+        threading.Thread(target=comprador,
+                         args=(app, anuncio_id, usuario_id, args.tentativas, args.reenvio, latencias, inicio))
+        for _ in range(args.compradores)
+    ]
+    for t in threads:
+        t.start()
+    t0 = time.perf_counter()
+    inicio.set()
+    for t in threads:
+        t.join()
+    duracao = time.perf_counter() - t0
+
+    with app.app_context():
+        vendidas = db.session.query(db.func.coalesce(db.func.sum(Compra.quantidade), 0)) \
+                             .filter(Compra.anuncio_id == anuncio_id).scalar()
+        compras = Compra.query.filter_by(anuncio_id=anuncio_id).count()
+        chaves = db.session.query(db.func.count(db.distinct(Compra.chave_idempotencia))).scalar()
+        estoque_final = db.session.get(Anuncio, anuncio_id).estoque
+
+    latencias.sort()
+    p = lambda q: latencias[min(len(latencias) - 1, int(q * len(latencias)))] * 1000
+    print(f"requisições       : {len(latencias)} em {duracao:.2f}s ({len(latencias) / duracao:.0f} req/s)")
+    print(f"latência p50/p99  : {p(0.50):.1f} / {p(0.99):.1f} ms")
+    print(f"compras gravadas  : {compras} ({vendidas} unidades, estoque inicial {args.estoque})")
+    print(f"estoque final     : {estoque_final}")
+    print(f"oversell          : {max(0, vendidas - args.estoque)}")
+    print(f"duplicatas        : {compras - chaves}")
+    print(f"consistente       : {estoque_final == args.estoque - vendidas}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,20 @@
+"""Percentis e resumo de uma série de latências (em segundos)."""
+
+
+def percentil(ordenadas, q):
+    if not ordenadas:
+        return 0.0
+    return ordenadas[min(len(ordenadas) - 1, int(q * len(ordenadas)))]
+
+
+def resumir(latencias, duracao, erros=0):
+    ordenadas = sorted(latencias)
+    return {
+        "n": len(ordenadas),
+        "erros": erros,
+        "req_s": round(len(ordenadas) / duracao, 1) if duracao else 0.0,
+        "p50_ms": round(1000 * percentil(ordenadas, 0.50), 2),
+        "p95_ms": round(1000 * percentil(ordenadas, 0.95), 2),
+        "p99_ms": round(1000 * percentil(ordenadas, 0.99), 2),
+        "max_ms": round(1000 * (ordenadas[-1] if ordenadas else 0.0), 2),
+    }
@@ -0,0 +1,90 @@
+"""Benchmark do hash de senhas em cada fator de trabalho (SENHA_ITERACOES).
+
+Para cada valor de --iteracoes mede:
+  * hashes/s do pool sozinho (--hashes senhas calculadas de uma vez);
+  * latência do cadastro (POST /usuario/criar) com --concorrencia threads
+    fazendo --cadastros requisições no total, o que inclui a fila do pool.
+
+Uso:
+    python benchmarks/hash_senhas.py --db sqlite:////tmp/bench_senhas.db \\
+        --iteracoes 100000,260000,600000 --concorrencia 16 --cadastros 400 \\
+        --pool thread --trabalhadores 4
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from ecommerce import create_app, db, senhas  # noqa: E402
+from estatisticas import resumir  # noqa: E402
+
+
+def cadastrar(app, prefixo, quantidade, latencias, erros, inicio):
+    cliente = app.test_client()
+    inicio.wait()
+    for n in range(quantidade):
+        t0 = time.perf_counter()
+        resposta = cliente.post("/usuario/criar", data={
+            "nome": f"{prefixo}-{n}", "email": f"{prefixo}-{n}@bench", "senha": "segredo123",
+        })
+        latencias.append(time.perf_counter() - t0)
+        if resposta.status_code >= 400:
+            erros.append(resposta.status_code)
+
+
+def medir(app, iteracoes, args):
+    app.config["SENHA_ITERACOES"] = iteracoes
+
+    t0 = time.perf_counter()
+    senhas.gerar_varios([f"senha-{n}" for n in range(args.hashes)])
+    hashes_s = args.hashes / (time.perf_counter() - t0)
+
+    latencias, erros, inicio = [], [], threading.Event()
+    por_thread = max(1, args.cadastros // args.concorrencia)
+    threads = [
+        threading.Thread(target=cadastrar,
+                         args=(app, f"{iteracoes}-{i}", por_thread, latencias, erros, inicio))
+        for i in range(args.concorrencia)
+    ]
+    for t in threads:
+        t.start()
+    t0 = time.perf_counter()
+    inicio.set()
+    for t in threads:
+        t.join()
+    return hashes_s, resumir(latencias, time.perf_counter() - t0, len(erros))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default="sqlite:////tmp/bench_senhas.db")
+    parser.add_argument("--iteracoes", default="50000,100000,260000,600000",
+                        help="fatores de trabalho separados por vírgula")
+    parser.add_argument("--hashes", type=int, default=64, help="hashes no teste de vazão do pool")
+    parser.add_argument("--cadastros", type=int, default=200)
+    parser.add_argument("--concorrencia", type=int, default=16)
+    parser.add_argument("--pool", choices=("thread", "processo"), default="thread")
+    parser.add_argument("--trabalhadores", type=int, default=0, help="0 = nº de CPUs")
+    args = parser.parse_args()
+
+    app = create_app({"SQLALCHEMY_DATABASE_URI": args.db, "DB_POOL_SIZE": args.concorrencia,
+                      "SQLITE_BUSY_TIMEOUT": 60, "CACHE_PAGINAS": False,
+                      "SENHA_POOL": args.pool, "SENHA_TRABALHADORES": args.trabalhadores,
+                      "SENHA_FILA": args.concorrencia, "SENHA_ESPERA": 120})
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+
+    print(f"{'iterações':>10}  {'hashes/s':>9}  {'cadastros/s':>11}  {'p50 ms':>8}  {'p99 ms':>8}  erros")
+    for iteracoes in [int(v) for v in args.iteracoes.split(",")]:
+        hashes_s, r = medir(app, iteracoes, args)
+        print(f"{iteracoes:>10}  {hashes_s:>9.1f}  {r['req_s']:>11.1f}  {r['p50_ms']:>8.1f}  "
+              f"{r['p99_ms']:>8.1f}  {r['erros']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Compara o modo síncrono (gunicorn) com o ASGI (uvicorn + assincrono.py) sob muitas conexões.
+
+Uso:
+    python benchmarks/semear.py --db mysql://u:s@db/bench --escala media
+    python benchmarks/modo_asgi.py --db mysql://u:s@db/bench --conexoes 1000 --duracao 30 \\
+        --saida /tmp/modos
+
+Sobe cada servidor por vez no mesmo banco, com o mesmo nº de workers, e roda
+carga.py contra as rotas de leitura com --conexoes conexões keep-alive no
+total. Grava <saida>-sync.json e <saida>-asgi.json (comparáveis com
+comparar.py) e imprime req/s e p99 lado a lado. O ganho do modo ASGI vem de
+não prender uma thread enquanto a consulta espera o banco: meça contra o
+MySQL pela rede; num SQLite local quase não há espera de I/O a esconder.
+"""
+import argparse
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ROTAS = [
+    "/cad/anuncios", "/cad/anuncios?ordem=vendidos", "/categoria/1/anuncios?ordem=preco",
+    "/anuncios/pergunta", "/anuncios/compra", "/busca?q=camera", "/relatorios/vendas",
+    "/api/v1/anuncios?limit=50", "/api/anuncios/search?q=cam",
+]
+
+
+def _comando(modo, args):
+    endereco = f"127.0.0.1:{args.porta}"
+    if modo == "sync":
+        # gthread: cada conexão em espera ocupa uma das --threads do worker
+        return ["gunicorn", "-w", str(args.workers), "-k", "gthread", "--threads", str(args.threads),
+                "-b", endereco, "--log-level", "warning", "ecommerce:create_app()"]
+    return ["uvicorn", "--factory", "assincrono:criar_app_asgi", "--workers", str(args.workers),
+            "--host", "127.0.0.1", "--port", str(args.porta), "--log-level", "warning",
+            "--backlog", str(max(2048, args.conexoes * 2))]
+
+
+def _esperar_porta(porta, limite=30.0):
+    fim = time.monotonic() + limite
+    while time.monotonic() < fim:
+        try:
+            socket.create_connection(("127.0.0.1", porta), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise SystemExit(f"servidor não subiu na porta {porta}")
+
+
+def _rodar(modo, args):
+    ambiente = dict(os.environ, DATABASE_URL=args.db, CACHE_PAGINAS="1" if args.cache else "0",
+                    ASSINCRONO_THREADS=str(args.threads))
+    servidor = subprocess.Popen(_comando(modo, args), cwd=RAIZ, env=ambiente, start_new_session=True)
+    saida = f"{args.saida}-{modo}.json"
+    try:
+        _esperar_porta(args.porta)
+        for rota in args.rotas:  # aquece conexões, índice de busca e caches de lista
+            urllib.request.urlopen(f"http://127.0.0.1:{args.porta}{rota}", timeout=60).read()
+        print(f"== {modo}: {' '.join(_comando(modo, args))}")
+        subprocess.run([sys.executable, os.path.join(RAIZ, "benchmarks", "carga.py"),
+                        "--url", f"http://127.0.0.1:{args.porta}", "--processos", str(args.processos),
+                        "--conexoes", str(args.conexoes // args.processos), "--duracao", str(args.duracao),
+                        "--pid", str(servidor.pid), "--saida", saida, *args.rotas], check=True)
+    finally:
+        os.killpg(servidor.pid, signal.SIGTERM)
+        servidor.wait(30)
+    with open(saida) as f:
+        resultado = json.load(f)
+    resultado["meta"].update(modo=modo, workers=args.workers, threads=args.threads, cache_paginas=args.cache)
+    with open(saida, "w") as f:
+        json.dump(resultado, f, indent=2, ensure_ascii=False)
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", required=True, help="URL do banco semeado (DATABASE_URL dos servidores)")
+    parser.add_argument("--conexoes", type=int, default=1000, help="conexões simultâneas no total")
+    parser.add_argument("--processos", type=int, default=min(8, os.cpu_count() or 1),
+                        help="processos do gerador de carga")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="workers de cada servidor")
+    parser.add_argument("--threads", type=int, default=16,
+                        help="threads por worker do gunicorn (e ASSINCRONO_THREADS)")
+    parser.add_argument("--duracao", type=float, default=30.0, help="segundos por modo")
+    parser.add_argument("--porta", type=int, default=8765)
+    parser.add_argument("--cache", action="store_true", help="liga o cache de páginas (padrão: desligado)")
+    parser.add_argument("--modos", default="sync,asgi")
+    parser.add_argument("--saida", default="modo_asgi", help="prefixo dos arquivos JSON")
+    parser.add_argument("rotas", nargs="*", default=ROTAS)
+    args = parser.parse_args()
+
+    resultados = {modo: _rodar(modo, args) for modo in args.modos.split(",")}
+    print(f"\n{args.conexoes} conexões, {args.workers} workers, {args.duracao:.0f}s por modo")
+    print(f"{'modo':6} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'erros':>7} {'RSS MB':>8}")
+    for modo, r in resultados.items():
+        total = r["rotas"]["(total)"]
+        print(f"{modo:6} {total['req_s']:>9} {total['p50_ms']:>9} {total['p99_ms']:>9} {total['erros']:>7} "
+              f"{r['meta']['pico_rss_servidor_mb'] or '-':>8}")
+
+
+if __name__ == "__main__":
+    main()
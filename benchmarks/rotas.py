@@ -0,0 +1,252 @@
+"""Mede cada rota do ecommerce.py pelo test client do Flask, sobre um banco semeado.
+
+Uso:
+    python benchmarks/semear.py --db sqlite:////tmp/bench.db --escala pequena
+    python benchmarks/rotas.py --db sqlite:////tmp/bench.db --iteracoes 200 --saida resultado.json
+    python benchmarks/comparar.py antes.json depois.json
+
+Cada cenário roda num processo filho (fork), então o pico de RSS reportado é
+o daquela rota. Linhas de que a rota precisa (ex.: o anúncio a ser excluído)
+são criadas antes de cada requisição, fora da medição.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import time
+import uuid
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from estatisticas import resumir  # noqa: E402
+
+PALAVRAS = "camera celular notebook livro cadeira mesa tenis bicicleta fone monitor".split()
+
+
+class Contexto:
+    """Sorteio de ids existentes e helpers para criar linhas descartáveis."""
+
+    def __init__(self, E, semente):
+        self.E = E
+        self.rng = random.Random(semente)
+        db = E.db
+        self.modelos = {"usuario": E.Usuario, "categoria": E.Categoria, "anuncio": E.Anuncio,
+                        "compra": E.Compra, "pergunta": E.Pergunta}
+        self.faixas = {
+            nome: db.session.query(db.func.min(m.id), db.func.max(m.id)).one()
+            for nome, m in self.modelos.items()
+        }
+
+    def id(self, entidade):
+        """Um id sorteado entre as linhas que ainda existem (e não estão excluídas).
+
+        Sorteia na faixa e pega a primeira linha viva a partir dali pela PK:
+        cenários anteriores apagam linhas, e um id solto da faixa daria 404 ou
+        erro de FK. Se não houver nenhuma acima, volta para a última abaixo.
+        """
+        minimo, maximo = self.faixas[entidade]
+        modelo = self.modelos[entidade]
+        vivas = [modelo.excluido_em.is_(None)] if hasattr(modelo, "excluido_em") else []
+        sorteado = self.rng.randint(minimo, maximo)
+        consulta = self.E.db.session.query(modelo.id).filter(*vivas)
+        id = (consulta.filter(modelo.id >= sorteado).order_by(modelo.id).limit(1).scalar()
+              or consulta.filter(modelo.id < sorteado).order_by(modelo.id.desc()).limit(1).scalar())
+        if id is None:
+            raise LookupError(f"nenhuma linha de {entidade} no banco; rode semear.py")
+        return id
+
+    def _inserir(self, modelo, **valores):
+        db = self.E.db
+        id = db.session.execute(modelo.__table__.insert(), valores).inserted_primary_key[0]
+        db.session.commit()
+        return id
+
+    def novo_usuario(self):
+        email = f"{uuid.uuid4().hex}@bench.local"
+        return self._inserir(self.E.Usuario, nome="Descartável", email=email, senha="bench"), email
+
+    def nova_categoria(self):
+        return self._inserir(self.E.Categoria, nome=f"Descartável {uuid.uuid4().hex}")
+
+    def novo_anuncio(self):
+        return self._inserir(self.E.Anuncio, titulo="Descartável", preco=10, categoria_id=self.id("categoria"),
+                             usuario_id=self.id("usuario"))
+
+    def nova_pergunta(self):
+        anuncio = self.E.db.session.get(self.E.Anuncio, self.id("anuncio"))
+        return self._inserir(self.E.Pergunta, anuncio_id=anuncio.id, usuario_id=self.id("usuario"),
+                             vendedor_id=anuncio.usuario_id, texto="Descartável?")
+
+    def nova_compra(self):
+        return self.E.registrar_compra(self.novo_anuncio(), self.id("usuario"), 1)[0]
+
+
+def _meio(ctx, entidade):
+    minimo, maximo = ctx.faixas[entidade]
+    return (minimo + maximo) // 2
+
+
+def _logado(c, a):
+    return c.id("usuario")
+
+
+# (nome, método, preparar(ctx) -> alvo | None, url(ctx, alvo), dados(ctx, alvo) | None
+#  [, logado(ctx, alvo) -> usuario_id da sessão])
+CENARIOS = [
+    ("index", "GET", None, lambda c, a: "/", None),
+    ("usuario", "GET", None, lambda c, a: "/cad/usuario", None),
+    ("criarusuario", "POST", None, lambda c, a: "/usuario/criar",
+     lambda c, a: {"user": "Bench", "email": f"{uuid.uuid4().hex}@bench.local", "passwd": "123456"}),
+    ("editarusuario_get", "GET", None, lambda c, a: f"/usuario/editar/{c.id('usuario')}", None),
+    ("editarusuario_post", "POST", lambda c: c.novo_usuario(), lambda c, a: f"/usuario/editar/{a[0]}",
+     lambda c, a: {"user": "Editado", "email": a[1], "passwd": "654321"}),
+    ("deletarusuario_get", "GET", None, lambda c, a: f"/usuario/deletar/{c.id('usuario')}", None),
+    ("deletarusuario_post", "POST", lambda c: c.novo_usuario(), lambda c, a: f"/usuario/deletar/{a[0]}", None),
+    ("categoria", "GET", None, lambda c, a: "/config/categoria", None),
+    ("categoria_post", "POST", None, lambda c, a: "/config/categoria",
+     lambda c, a: {"nome": f"Bench {uuid.uuid4().hex}"}),
+    ("editarcategoria_get", "GET", None, lambda c, a: f"/categoria/editar/{c.id('categoria')}", None),
+    ("editarcategoria_post", "POST", lambda c: c.nova_categoria(), lambda c, a: f"/categoria/editar/{a}",
+     lambda c, a: {"nome": f"Editada {uuid.uuid4().hex}"}),
+    ("deletarcategoria_post", "POST", lambda c: c.nova_categoria(), lambda c, a: f"/categoria/deletar/{a}", None),
+    ("anuncios", "GET", None, lambda c, a: "/cad/anuncios", None),
+    ("anuncios_pagina_profunda", "GET", None,
+     lambda c, a: f"/cad/anuncios?after={_meio(c, 'anuncio')}&limit=50", None),
+    ("anuncios_post", "POST", None, lambda c, a: "/cad/anuncios",
+     lambda c, a: {"nome": "Bench", "desc": "descrição", "preco": "19,90", "cat": c.id("categoria")}, _logado),
+    ("editaranuncio_get", "GET", None, lambda c, a: f"/anuncio/editar/{c.id('anuncio')}", None),
+    ("editaranuncio_post", "POST", lambda c: c.novo_anuncio(), lambda c, a: f"/anuncio/editar/{a}",
+     lambda c, a: {"nome": "Editado", "desc": "", "preco": "29.90", "cat": c.id("categoria"),
+                   "uso": c.id("usuario")}),
+    ("deletaranuncio_post", "POST", lambda c: c.novo_anuncio(), lambda c, a: f"/anuncio/deletar/{a}", None),
+    ("pergunta", "GET", None, lambda c, a: "/anuncios/pergunta", None),
+    ("pergunta_post", "POST", None, lambda c, a: "/anuncios/pergunta",
+     lambda c, a: {"anuncio_id": c.id("anuncio"), "texto": "Tem garantia?"}, _logado),
+    ("editarpergunta_get", "GET", None, lambda c, a: f"/pergunta/editar/{c.id('pergunta')}", None),
+    ("editarpergunta_post", "POST", lambda c: c.nova_pergunta(), lambda c, a: f"/pergunta/editar/{a}",
+     lambda c, a: {"texto": "Tem garantia?", "resposta": "Sim, 1 ano."}),
+    ("deletarpergunta_post", "POST", lambda c: c.nova_pergunta(), lambda c, a: f"/pergunta/deletar/{a}", None),
+    ("caixa_perguntas", "GET", lambda c: c.id("usuario"), lambda c, a: f"/vendedor/{a}/perguntas", None,
+     lambda c, a: a),
+    ("anuncio_perguntas", "GET", None, lambda c, a: f"/anuncio/{c.id('anuncio')}/perguntas", None),
+    ("compra", "GET", None, lambda c, a: "/anuncios/compra", None),
+    ("compra_post", "POST", None, lambda c, a: "/anuncios/compra",
+     lambda c, a: {"anuncio_id": c.id("anuncio"), "quantidade": 1, "chave_idempotencia": uuid.uuid4().hex},
+     _logado),
+    ("editarcompra_get", "GET", None, lambda c, a: f"/compras/editar/{c.id('compra')}", None),
+    ("editarcompra_post", "POST", lambda c: c.nova_compra(), lambda c, a: f"/compras/editar/{a}",
+     lambda c, a: {"quantidade": 2}),
+    ("deletarcompra_post", "POST", lambda c: c.nova_compra(), lambda c, a: f"/compras/deletar/{a}", None),
+    ("busca", "GET", None, lambda c, a: f"/busca?q={c.rng.choice(PALAVRAS)}", None),
+    ("api_usuarios_search", "GET", None, lambda c, a: f"/api/usuarios/search?q={c.rng.choice(PALAVRAS)[:3]}", None),
+    ("api_anuncios_search", "GET", None, lambda c, a: f"/api/anuncios/search?q={c.rng.choice(PALAVRAS)[:3]}", None),
+    ("relVendas_vendedor", "GET", None, lambda c, a: "/relatorios/vendas?dimensao=vendedor&periodo=mes", None),
+    ("relVendas_categoria", "GET", None, lambda c, a: "/relatorios/vendas?dimensao=categoria&periodo=semana", None),
+    ("relCompras", "GET", None, lambda c, a: "/relatorios/compras?periodo=dia", None),
+    ("metrics", "GET", None, lambda c, a: "/metrics", None),
+]
+
+
+def _rodar_cenario(cenario, args, fila):
+    try:
+        fila.put((cenario[0], _medir(cenario, args)))
+    except Exception as e:  # o pai não pode ficar esperando um filho que morreu
+        fila.put((cenario[0], {"falha": repr(e)}))
+
+
+def _medir(cenario, args):
+    import ecommerce as E
+
+    nome, metodo, preparar, url, dados, *logado = cenario
+    app = E.create_app({"SQLALCHEMY_DATABASE_URI": args.db})
+    cliente = app.test_client()
+    with app.app_context():
+        E.db.engine.dispose()  # conexões herdadas do processo pai
+        ctx = Contexto(E, args.semente)
+        latencias, erros = [], 0
+        total = args.aquecimento + args.iteracoes
+        inicio_medicao = None
+        for i in range(total):
+            if i == args.aquecimento:
+                inicio_medicao = time.perf_counter()
+                latencias.clear()
+            alvo = preparar(ctx) if preparar else None
+            # os ids sorteados consultam o banco: fora da medição
+            caminho = url(ctx, alvo)
+            corpo = dados(ctx, alvo) if dados else None
+            if logado:
+                with cliente.session_transaction() as sessao:
+                    sessao["usuario_id"] = logado[0](ctx, alvo)
+            t0 = time.perf_counter()
+            if metodo == "GET":
+                resposta = cliente.get(caminho)
+            else:
+                resposta = cliente.post(caminho, data=corpo)
+            latencias.append(time.perf_counter() - t0)
+            if resposta.status_code >= 400:
+                erros += 1
+            resposta.close()
+        # o tempo de preparo entra na duração, então a vazão usa a soma das latências
+        resultado = resumir(latencias, sum(latencias), erros)
+        resultado["pico_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    return resultado
+
+
+def _commit_atual():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                       cwd=os.path.dirname(os.path.abspath(__file__)),
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default="sqlite:////tmp/bench.db")
+    parser.add_argument("--iteracoes", type=int, default=200)
+    parser.add_argument("--aquecimento", type=int, default=10)
+    parser.add_argument("--semente", type=int, default=7)
+    parser.add_argument("--rotas", help="nomes separados por vírgula (padrão: todas)")
+    parser.add_argument("--saida", help="arquivo JSON de resultado")
+    args = parser.parse_args()
+
+    escolhidas = set(args.rotas.split(",")) if args.rotas else None
+    mp = multiprocessing.get_context("fork")
+    fila = mp.Queue()
+    resultados = {}
+    print(f"{'rota':28} {'n':>5} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'rss MB':>7} {'erros':>5}")
+    for cenario in CENARIOS:
+        if escolhidas and cenario[0] not in escolhidas:
+            continue
+        processo = mp.Process(target=_rodar_cenario, args=(cenario, args, fila))
+        processo.start()
+        nome, r = fila.get()
+        processo.join()
+        resultados[nome] = r
+        if "falha" in r:
+            print(f"{nome:28} FALHOU: {r['falha']}")
+            continue
+        print(f"{nome:28} {r['n']:>5} {r['req_s']:>8} {r['p50_ms']:>8} {r['p95_ms']:>8} "
+              f"{r['p99_ms']:>8} {r['pico_rss_mb']:>7} {r['erros']:>5}")
+
+    if args.saida:
+        with open(args.saida, "w") as f:
+            json.dump({
+                "meta": {"commit": _commit_atual(), "data": datetime.now().isoformat(timespec="seconds"),
+                         "db": args.db.split("@")[-1], "iteracoes": args.iteracoes,
+                         "python": platform.python_version(), "modo": "test_client"},
+                "rotas": resultados,
+            }, f, indent=2, ensure_ascii=False)
+        print(f"resultado salvo em {args.saida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""Popula o banco com um conjunto sintético e reprodutível (mesma --semente, mesmos dados).
+
+Uso:
+    python benchmarks/semear.py --db sqlite:////tmp/bench.db --escala media
+    python benchmarks/semear.py --db mysql://... --usuarios 100000 --anuncios 1000000 --compras 5000000
+
+Insere com executemany em lotes (um commit por lote) e, no fim, reconstrói o
+resumo dos relatórios, os contadores por anúncio, as facetas por categoria e
+o índice de busca para o app subir pronto.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from array import array
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+ESCALAS = {
+    #             usuarios, anuncios, compras,  perguntas, categorias
+    "minima":    (200,      1_000,    5_000,    1_000,     10),
+    "pequena":   (2_000,    20_000,   100_000,  20_000,    30),
+    "media":     (20_000,   200_000,  1_000_000, 200_000,  60),
+    "grande":    (100_000,  1_000_000, 5_000_000, 1_000_000, 120),
+}
+
+PALAVRAS = ("camera celular notebook livro cadeira mesa tenis bicicleta fone monitor teclado "
+            "mouse geladeira fogao sofa relogio mochila jaqueta vestido panela").split()
+ADJETIVOS = "novo usado seminovo original importado nacional promoção kit azul preto".split()
+
+
+def em_lotes(total, tamanho):
+    for inicio in range(0, total, tamanho):
+        yield inicio, min(tamanho, total - inicio)
+
+
+def semear(db, modelos, usuarios, anuncios, compras, perguntas, categorias, lote=10_000, semente=42,
+           log=print):
+    Usuario, Categoria, Anuncio, Compra, Pergunta = modelos
+    rng = random.Random(semente)
+    agora = datetime.now().replace(microsecond=0)
+
+    def inserir(tabela, linhas):
+        db.session.execute(tabela.insert(), linhas)
+        db.session.commit()
+
+    t0 = time.perf_counter()
+    inserir(Categoria.__table__, [{"nome": f"Categoria {i}"} for i in range(1, categorias + 1)])
+    categoria_ids = [id for (id,) in db.session.query(Categoria.id)]
+
+    for inicio, n in em_lotes(usuarios, lote):
+        inserir(Usuario.__table__, [
+            {"nome": f"{rng.choice(PALAVRAS).title()} {inicio + i}", "email": f"u{inicio + i}@bench.local",
+             "senha": "bench"}
+            for i in range(n)
+        ])
+    usuario_min, usuario_max = db.session.query(db.func.min(Usuario.id), db.func.max(Usuario.id)).one()
+    log(f"usuarios  : {usuarios} ({time.perf_counter() - t0:.1f}s)")
+
+    # preço em centavos e dono em arrays compactos: 1M anúncios cabem em 8 MB
+    precos, donos = array("i"), array("i")
+    for inicio, n in em_lotes(anuncios, lote):
+        linhas = []
+        for _ in range(n):
+            centavos = rng.randint(100, 500_000)
+            precos.append(centavos)
+            donos.append(rng.randint(usuario_min, usuario_max))
+            linhas.append({
+                "titulo": f"{rng.choice(PALAVRAS).title()} {rng.choice(ADJETIVOS)} {rng.randint(1, 9999)}",
+                "descricao": " ".join(rng.choices(PALAVRAS + ADJETIVOS, k=12)),
+                "preco": Decimal(centavos) / 100,
+                "estoque": None if rng.random() < 0.8 else rng.randint(0, 500),
+                "categoria_id": rng.choice(categoria_ids),
+                "usuario_id": donos[-1],
+            })
+        inserir(Anuncio.__table__, linhas)
+    anuncio_min = db.session.query(db.func.min(Anuncio.id)).scalar()
+    log(f"anuncios  : {anuncios} ({time.perf_counter() - t0:.1f}s)")
+
+    for inicio, n in em_lotes(compras, lote):
+        linhas = []
+        for _ in range(n):
+            indice = rng.randrange(anuncios)
+            quantidade = rng.randint(1, 5)
+            linhas.append({
+                "usuario_id": rng.randint(usuario_min, usuario_max),
+                "anuncio_id": anuncio_min + indice,
+                "quantidade": quantidade,
+                "total": Decimal(precos[indice] * quantidade) / 100,
+                "criado_em": agora - timedelta(seconds=rng.randint(0, 365 * 86400)),
+            })
+        inserir(Compra.__table__, linhas)
+    log(f"compras   : {compras} ({time.perf_counter() - t0:.1f}s)")
+
+    for inicio, n in em_lotes(perguntas, lote):
+        linhas = []
+        for _ in range(n):
+            indice = rng.randrange(anuncios)
+            respondida = rng.random() < 0.6
+            linhas.append({
+                "anuncio_id": anuncio_min + indice,
+                "usuario_id": rng.randint(usuario_min, usuario_max),
+                "vendedor_id": donos[indice],
+                "texto": "Ainda está disponível?",
+                "resposta": "Sim!" if respondida else None,
+                "respondida": respondida,
+                "criado_em": agora - timedelta(seconds=rng.randint(0, 365 * 86400)),
+            })
+        inserir(Pergunta.__table__, linhas)
+    log(f"perguntas : {perguntas} ({time.perf_counter() - t0:.1f}s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default="sqlite:////tmp/bench.db")
+    parser.add_argument("--escala", choices=sorted(ESCALAS), default="pequena")
+    parser.add_argument("--usuarios", type=int)
+    parser.add_argument("--anuncios", type=int)
+    parser.add_argument("--compras", type=int)
+    parser.add_argument("--perguntas", type=int)
+    parser.add_argument("--categorias", type=int)
+    parser.add_argument("--lote", type=int, default=10_000)
+    parser.add_argument("--semente", type=int, default=42)
+    args = parser.parse_args()
+
+    padrao = dict(zip(("usuarios", "anuncios", "compras", "perguntas", "categorias"), ESCALAS[args.escala]))
+    tamanhos = {k: getattr(args, k) if getattr(args, k) is not None else v for k, v in padrao.items()}
+
+    from ecommerce import create_app, db, Usuario, Categoria, Anuncio, Compra, Pergunta, \
+        reconstruir_resumo, reconciliar_contadores, reconstruir_facetas, construir_indice_busca
+
+    app = create_app({"SQLALCHEMY_DATABASE_URI": args.db})
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        semear(db, (Usuario, Categoria, Anuncio, Compra, Pergunta), lote=args.lote,
+               semente=args.semente, **tamanhos)
+        t0 = time.perf_counter()
+        compras, baldes = reconstruir_resumo()
+        print(f"resumo    : {baldes} baldes ({time.perf_counter() - t0:.1f}s)")
+        t0 = time.perf_counter()
+        verificados, _ = reconciliar_contadores()
+        print(f"contadores: {verificados} anúncios ({time.perf_counter() - t0:.1f}s)")
+        t0 = time.perf_counter()
+        print(f"facetas   : {reconstruir_facetas()} linhas ({time.perf_counter() - t0:.1f}s)")
+        t0 = time.perf_counter()
+        print(f"busca     : {len(construir_indice_busca())} anúncios indexados ({time.perf_counter() - t0:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+"""Índice invertido em memória com ranking BM25 para a busca de anúncios.
+
+O índice vive em cada processo. Para vários workers enxergarem as mesmas
+alterações há um snapshot em disco (pickle) e um diário de operações
+(`<snapshot>.log.<geração>`, uma linha JSON por operação) que cada processo
+reaplica a partir do ponto onde parou. As operações são idempotentes, então
+reaplicar as próprias alterações não tem efeito colateral.
+
+salvar() não zera o diário, que outros processos podem estar anexando:
+abre a geração seguinte e grava no snapshot até que posição da atual ele
+já inclui. Quem carrega o snapshot lê o resto da geração anterior (o que
+chegou de processos que ainda não o tinham visto) e a nova; diários mais
+antigos que esses dois são apagados. Quando a geração atual passa de
+`limite_diario` bytes, `ao_passar_limite()` é chamada (uma vez por geração
+em cada processo) para alguém salvar um snapshot novo; sem isso cada
+processo novo reaplicaria o diário inteiro ao subir.
+"""
+import heapq
+import json
+import math
+import os
+import pickle
+import re
+import tempfile
+import threading
+import unicodedata
+from collections import Counter
+
+FORMATO = 2
+
+STOPWORDS = frozenset("""
+a o as os um uma uns umas de do da dos das em no na nos nas por para com sem
+e ou que se ao aos the and for
+""".split())
+
+_PALAVRA = re.compile(r"[a-z0-9]+")
+
+
+def normalizar(texto):
+    """Minúsculas e sem acentos: 'Câmera Ação' -> 'camera acao'."""
+    decomposto = unicodedata.normalize("NFKD", texto or "")
+    return "".join(ch for ch in decomposto if not unicodedata.combining(ch)).lower()
+
+
+def tokenizar(texto):
+    return [t for t in _PALAVRA.findall(normalizar(texto)) if t not in STOPWORDS]
+
+
+class IndiceInvertido:
+    """BM25 sobre título (peso 2) e descrição, com filtros por categoria e preço."""
+
+    k1 = 1.2
+    b = 0.75
+    peso_titulo = 2
+
+    def __init__(self, caminho=None, limite_diario=None, ao_passar_limite=None):
+        self.caminho = caminho
+        self.limite_diario = limite_diario
+        self.ao_passar_limite = ao_passar_limite
+        self._limite_avisado = False
+        self._postings = {}   # termo -> {doc_id: tf}
+        self._docs = {}       # doc_id -> (comprimento, categoria_id, preco, termos)
+        self._comprimento_total = 0
+        self._lock = threading.RLock()
+        self._snapshot_mtime = None
+        self._geracao = 0
+        self._offsets = {0: 0}  # geração do diário -> posição já aplicada
+
+    def __len__(self):
+        return len(self._docs)
+
+    # ---------- alteração ----------
+
+    def _aplicar(self, op):
+        if op["op"] == "add":
+            self._adicionar(op["id"], op["titulo"], op["descricao"], op["categoria_id"], op["preco"])
+        elif op["op"] == "del":
+            self._remover(op["id"])
+        elif op["op"] == "mover":
+            self._mover_categoria(op["origem"], op["destino"])
+
+    def _adicionar(self, doc_id, titulo, descricao, categoria_id, preco):
+        self._remover(doc_id)
+        tf = Counter(tokenizar(descricao))
+        for termo in tokenizar(titulo):
+            tf[termo] += self.peso_titulo
+        for termo, freq in tf.items():
+            self._postings.setdefault(termo, {})[doc_id] = freq
+        comprimento = sum(tf.values())
+        self._docs[doc_id] = (comprimento, categoria_id, float(preco), tuple(tf))
+        self._comprimento_total += comprimento
+
+    def _remover(self, doc_id):
+        doc = self._docs.pop(doc_id, None)
+        if doc is None:
+            return
+        comprimento, _, _, termos = doc
+        self._comprimento_total -= comprimento
+        for termo in termos:
+            docs = self._postings.get(termo)
+            if docs is not None:
+                docs.pop(doc_id, None)
+                if not docs:
+                    del self._postings[termo]
+
+    def _mover_categoria(self, origem, destino):
+        for doc_id, (comprimento, categoria_id, preco, termos) in self._docs.items():
+            if categoria_id == origem:
+                self._docs[doc_id] = (comprimento, destino, preco, termos)
+
+    def _registrar(self, op):
+        with self._lock:
+            self.sincronizar()  # não anexa a um diário que outro processo já rodou
+            self._aplicar(op)
+            if not self.caminho:
+                return
+            with open(self._diario(self._geracao), "a", encoding="utf-8") as f:
+                f.write(json.dumps(op) + "\n")
+                tamanho = f.tell()
+            avisar = (self.limite_diario and self.ao_passar_limite and not self._limite_avisado
+                      and tamanho > self.limite_diario)
+            if avisar:
+                self._limite_avisado = True
+        if avisar:
+            self.ao_passar_limite()
+
+    def adicionar(self, doc_id, titulo, descricao, categoria_id, preco):
+        """Insere ou substitui o documento."""
+        self._registrar({"op": "add", "id": doc_id, "titulo": titulo, "descricao": descricao or "",
+                         "categoria_id": categoria_id, "preco": str(preco)})
+
+    def carregar_em_lote(self, linhas):
+        """Indexa (id, titulo, descricao, categoria_id, preco) sem passar pelo diário.
+
+        Para montar o índice do zero; chame `salvar()` depois.
+        """
+        with self._lock:
+            for doc_id, titulo, descricao, categoria_id, preco in linhas:
+                self._adicionar(doc_id, titulo, descricao or "", categoria_id, preco)
+
+    def remover(self, doc_id):
+        self._registrar({"op": "del", "id": doc_id})
+
+    def mover_categoria(self, origem, destino):
+        self._registrar({"op": "mover", "origem": origem, "destino": destino})
+
+    # ---------- consulta ----------
+
+    def buscar(self, consulta, categoria_id=None, preco_min=None, preco_max=None, limite=20):
+        """Lista de (doc_id, score) em ordem decrescente de relevância."""
+        self.sincronizar()
+        termos = set(tokenizar(consulta))
+        with self._lock:
+            n = len(self._docs)
+            if not n or not termos:
+                return []
+            media = self._comprimento_total / n
+            scores = {}
+            for termo in termos:
+                docs = self._postings.get(termo)
+                if not docs:
+                    continue
+                idf = math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+                for doc_id, tf in docs.items():
+                    comprimento, cat, preco, _ = self._docs[doc_id]
+                    if categoria_id is not None and cat != categoria_id:
+                        continue
+                    if preco_min is not None and preco < preco_min:
+                        continue
+                    if preco_max is not None and preco > preco_max:
+                        continue
+                    norm = tf + self.k1 * (1 - self.b + self.b * comprimento / media)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / norm
+            return heapq.nlargest(limite, scores.items(), key=lambda item: item[1])
+
+    # ---------- persistência ----------
+
+    def _diario(self, geracao):
+        return f"{self.caminho}.log.{geracao}"
+
+    def _geracoes_em_disco(self):
+        pasta, nome = os.path.split(self.caminho)
+        prefixo = nome + ".log."
+        geracoes = []
+        for arquivo in os.listdir(pasta or "."):
+            if arquivo.startswith(prefixo) and arquivo[len(prefixo):].isdigit():
+                geracoes.append(int(arquivo[len(prefixo):]))
+        return geracoes
+
+    def salvar(self):
+        """Grava o snapshot atomicamente e passa o diário para a geração seguinte."""
+        with self._lock:
+            pasta = os.path.dirname(self.caminho) or "."
+            os.makedirs(pasta, exist_ok=True)
+            geracoes = self._geracoes_em_disco()
+            atual = max(geracoes, default=0)
+            if self._snapshot_mtime is not None and atual == self._geracao:
+                self._ler_diario()
+                offset = self._offsets[atual]
+            else:
+                # índice montado do banco (ou de um snapshot velho): o que já
+                # está no diário atual veio antes da leitura e fica de fora
+                try:
+                    offset = os.path.getsize(self._diario(atual))
+                except FileNotFoundError:
+                    offset = 0
+            nova = atual + 1
+            open(self._diario(nova), "a").close()
+            estado = {
+                "formato": FORMATO,
+                "postings": self._postings,
+                "docs": self._docs,
+                "comprimento_total": self._comprimento_total,
+                "geracao": nova,
+                "anterior": (atual, offset),
+            }
+            fd, tmp = tempfile.mkstemp(dir=pasta)
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(estado, f, pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self.caminho)
+            self._snapshot_mtime = os.stat(self.caminho).st_mtime_ns
+            self._geracao = nova
+            self._offsets = {atual: offset, nova: 0}
+            self._limite_avisado = False
+            for geracao in geracoes:
+                if geracao < atual:
+                    try:
+                        os.remove(self._diario(geracao))
+                    except FileNotFoundError:
+                        pass
+
+    def carregar(self):
+        """Lê o snapshot e reaplica o diário. Devolve False se não há snapshot."""
+        with self._lock:
+            try:
+                with open(self.caminho, "rb") as f:
+                    estado = pickle.load(f)
+                mtime = os.stat(self.caminho).st_mtime_ns
+            except FileNotFoundError:
+                return False
+            if estado.get("formato") != FORMATO:
+                return False
+            self._postings = estado["postings"]
+            self._docs = estado["docs"]
+            self._comprimento_total = estado["comprimento_total"]
+            self._snapshot_mtime = mtime
+            anterior, offset = estado["anterior"]
+            self._geracao = estado["geracao"]
+            self._offsets = {anterior: offset, self._geracao: 0}
+            self._limite_avisado = False
+            self._ler_diario()
+            return True
+
+    def sincronizar(self):
+        """Aplica o que outros processos gravaram no diário desde a última leitura."""
+        if not self.caminho or self._snapshot_mtime is None:
+            return
+        with self._lock:
+            try:
+                mtime = os.stat(self.caminho).st_mtime_ns
+            except FileNotFoundError:
+                return
+            if mtime != self._snapshot_mtime:
+                self.carregar()  # alguém salvou ou reconstruiu o índice
+            else:
+                self._ler_diario()
+
+    def _ler_diario(self):
+        for geracao in sorted(self._offsets):
+            try:
+                with open(self._diario(geracao), "r", encoding="utf-8") as f:
+                    f.seek(self._offsets[geracao])
+                    for linha in iter(f.readline, ""):
+                        if not linha.endswith("\n"):
+                            break  # linha ainda sendo escrita
+                        self._aplicar(json.loads(linha))
+                        self._offsets[geracao] = f.tell()
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,175 @@
+"""Camada de cache plugável (memória LRU, arquivo compartilhado ou Redis).
+
+Todos os backends têm a mesma interface: get / set / delete / clear / stats.
+`get` devolve None quando a chave não existe ou expirou.
+"""
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+
+class _Cache:
+    """Base com contadores de acerto/erro (por processo)."""
+
+    nome = "base"
+
+    def __init__(self, ttl=300):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    def _conta(self, valor):
+        if valor is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return valor
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "backend": self.nome,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+class CacheMemoria(_Cache):
+    """LRU em memória com TTL, seguro entre threads (não entre processos)."""
+
+    nome = "memoria"
+
+    def __init__(self, ttl=300, maxsize=256):
+        super().__init__(ttl)
+        self.maxsize = maxsize
+        self._dados = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, chave):
+        with self._lock:
+            item = self._dados.get(chave)
+            if item is not None:
+                expira_em, valor = item
+                if expira_em < time.monotonic():
+                    del self._dados[chave]
+                    item = None
+                else:
+                    self._dados.move_to_end(chave)
+            return self._conta(item and item[1])
+
+    def set(self, chave, valor, ttl=None):
+        expira_em = time.monotonic() + (ttl or self.ttl)
+        with self._lock:
+            self._dados[chave] = (expira_em, valor)
+            self._dados.move_to_end(chave)
+            while len(self._dados) > self.maxsize:
+                self._dados.popitem(last=False)
+
+    def delete(self, chave):
+        with self._lock:
+            self._dados.pop(chave, None)
+
+    def clear(self):
+        with self._lock:
+            self._dados.clear()
+
+    def stats(self):
+        dados = super().stats()
+        dados["itens"] = len(self._dados)
+        return dados
+
+
+class CacheArquivo(_Cache):
+    """Um arquivo por chave num diretório local, compartilhado entre workers.
+
+    A escrita é atômica (arquivo temporário + os.replace), então leitores em
+    outros processos nunca veem um valor pela metade.
+    """
+
+    nome = "arquivo"
+
+    def __init__(self, diretorio, ttl=300):
+        super().__init__(ttl)
+        self.diretorio = diretorio
+        os.makedirs(diretorio, exist_ok=True)
+
+    def _caminho(self, chave):
+        return os.path.join(self.diretorio, hashlib.sha1(chave.encode()).hexdigest())
+
+    def get(self, chave):
+        try:
+            with open(self._caminho(chave), "rb") as f:
+                expira_em, valor = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return self._conta(None)
+        if expira_em < time.time():
+            self.delete(chave)
+            return self._conta(None)
+        return self._conta(valor)
+
+    def set(self, chave, valor, ttl=None):
+        expira_em = time.time() + (ttl or self.ttl)
+        fd, tmp = tempfile.mkstemp(dir=self.diretorio)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump((expira_em, valor), f, pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self._caminho(chave))
+        except OSError:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+
+    def delete(self, chave):
+        try:
+            os.unlink(self._caminho(chave))
+        except FileNotFoundError:
+            pass
+
+    def clear(self):
+        for nome in os.listdir(self.diretorio):
+            try:
+                os.unlink(os.path.join(self.diretorio, nome))
+            except OSError:
+                pass
+
+
+class CacheRedis(_Cache):
+    """Backend Redis (requer o pacote `redis`)."""
+
+    nome = "redis"
+
+    def __init__(self, url, ttl=300, prefixo="ecommerce:"):
+        super().__init__(ttl)
+        import redis  # dependência opcional
+        self._redis = redis.Redis.from_url(url)
+        self.prefixo = prefixo
+
+    def get(self, chave):
+        bruto = self._redis.get(self.prefixo + chave)
+        return self._conta(pickle.loads(bruto) if bruto is not None else None)
+
+    def set(self, chave, valor, ttl=None):
+        self._redis.set(self.prefixo + chave, pickle.dumps(valor, pickle.HIGHEST_PROTOCOL),
+                        ex=int(ttl or self.ttl))
+
+    def delete(self, chave):
+        self._redis.delete(self.prefixo + chave)
+
+    def clear(self):
+        for chave in self._redis.scan_iter(self.prefixo + "*"):
+            self._redis.delete(chave)
+
+
+def criar_cache(config):
+    """Instancia o backend a partir das chaves CACHE_* da configuração do app."""
+    backend = config.get("CACHE_BACKEND", "memoria")
+    ttl = config.get("CACHE_TTL", 300)
+    if backend == "arquivo":
+        return CacheArquivo(config["CACHE_DIR"], ttl=ttl)
+    if backend == "redis":
+        return CacheRedis(config["CACHE_REDIS_URL"], ttl=ttl)
+    return CacheMemoria(ttl=ttl, maxsize=config.get("CACHE_MAXSIZE", 256))
@@ -0,0 +1,222 @@
+"""Cache de respostas HTML com carimbos de versão por tabela.
+
+Cada página declara de quais tabelas depende. A chave do cache inclui a
+rota, a query string e o carimbo atual de cada uma dessas tabelas; um
+commit que escreveu numa tabela troca o carimbo dela, então as páginas
+antigas simplesmente deixam de ser encontradas (e expiram pelo TTL).
+
+As tabelas escritas são detectadas nos eventos do SQLAlchemy (todo
+INSERT/UPDATE/DELETE, do ORM ou do Core) e os carimbos só mudam depois
+do commit, para nenhum leitor guardar dado velho sob o carimbo novo: no
+after_commit da Session ou, para commits fora dela (engine.begin()), quando
+a conexão volta ao pool.
+Os carimbos ficam no backend de cache do app: com vários workers use
+CACHE_BACKEND=arquivo ou redis, senão cada processo só vê as próprias
+escritas.
+
+O corpo é comprimido (gzip e, com o pacote `brotli` instalado, br) uma vez
+ao entrar no cache. Requisições com mensagens flash pendentes ou de quem
+entrou em /login (a página mostra o usuário) não leem nem gravam no cache.
+"""
+import gzip
+import hashlib
+import threading
+import uuid
+from functools import wraps
+
+from flask import Response, g, request, session
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import Pool
+from sqlalchemy.sql.dml import UpdateBase
+
+try:
+    import brotli  # dependência opcional
+except ImportError:
+    brotli = None
+
+COMPRIMIR_A_PARTIR_DE = 512  # bytes
+VERSAO_TTL = 30 * 24 * 3600
+
+_local = threading.local()
+
+
+@event.listens_for(Engine, "after_execute")
+def _anotar_escrita(conn, clauseelement, multiparams, params, execution_options, result):
+    if isinstance(clauseelement, UpdateBase):
+        conn.info.setdefault("_tabelas_escritas", set()).add(clauseelement.table.name)
+
+
+@event.listens_for(Session, "after_begin")
+def _marcar_da_sessao(sessao, transacao, conn):
+    conn.info["_da_sessao"] = True
+
+
+@event.listens_for(Engine, "commit")
+def _ao_confirmar(conn):
+    da_sessao = conn.info.pop("_da_sessao", False)
+    escritas = conn.info.pop("_tabelas_escritas", None)
+    if not escritas:
+        return
+    # o commit no banco ainda não terminou: os carimbos mudam no after_commit
+    # da sessão ou, sem sessão, quando a conexão volta ao pool
+    if da_sessao:
+        _local.__dict__.setdefault("pendentes", set()).update(escritas)
+    else:
+        conn.info.setdefault("_confirmadas", set()).update(escritas)
+
+
+@event.listens_for(Engine, "rollback")
+def _ao_desfazer(conn):
+    conn.info.pop("_da_sessao", None)
+    conn.info.pop("_tabelas_escritas", None)
+
+
+class CacheRespostas:
+    """Decorador de views GET + carimbos de versão guardados em `obter_backend()`."""
+
+    def __init__(self, app, obter_backend):
+        self.app = app
+        self._backend = obter_backend
+        event.listen(Session, "after_commit", self._apos_commit)
+        event.listen(Pool, "checkin", self._apos_devolver)
+
+    def _apos_commit(self, sessao):
+        pendentes = _local.__dict__.pop("pendentes", None)
+        if pendentes:
+            self.trocar_versao(*pendentes)
+
+    def _apos_devolver(self, dbapi_connection, registro):
+        confirmadas = registro.info.pop("_confirmadas", None)
+        if confirmadas:
+            self.trocar_versao(*confirmadas)
+
+    def trocar_versao(self, *tabelas):
+        backend = self._backend()
+        for tabela in tabelas:
+            backend.set(f"versao:{tabela}", uuid.uuid4().hex[:12], ttl=VERSAO_TTL)
+
+    def versoes(self, tabelas):
+        backend = self._backend()
+        carimbos = []
+        for tabela in tabelas:
+            carimbo = backend.get(f"versao:{tabela}")
+            if carimbo is None:
+                # nunca reaproveitar um carimbo que expirou: começa um novo
+                carimbo = uuid.uuid4().hex[:12]
+                backend.set(f"versao:{tabela}", carimbo, ttl=VERSAO_TTL)
+            carimbos.append(carimbo)
+        return carimbos
+
+    def em_cache(self, *tabelas):
+        """Cacheia a resposta GET da view enquanto nenhuma de `tabelas` for escrita."""
+        def decorador(view):
+            @wraps(view)
+            def envolvida(*args, **kwargs):
+                if not self._cacheavel():
+                    return self._privada(view(*args, **kwargs))
+
+                chave = self._chave(tabelas)
+                backend = self._backend()
+                entrada = backend.get(chave)
+                if entrada is None:
+                    resposta = self.app.make_response(view(*args, **kwargs))
+                    if resposta.status_code != 200 or resposta.direct_passthrough or session.modified:
+                        return self._privada(resposta)
+                    if resposta.is_streamed:
+                        # não segura o streaming: repassa os blocos e guarda ao final
+                        resposta.response = self._guardar_ao_final(resposta.response, chave,
+                                                                   resposta.mimetype, self._ttl())
+                        resposta.headers["Cache-Control"] = "public, no-cache"
+                        return resposta
+                    entrada = self._entrada(resposta)
+                    backend.set(chave, entrada, ttl=self._ttl())
+                return self._servir(entrada)
+            return envolvida
+        return decorador
+
+    def em_cache_async(self, *tabelas):
+        """em_cache para handlers `async def` (assincrono.py): mesmas chaves, sem streaming."""
+        def decorador(view):
+            @wraps(view)
+            async def envolvida(*args, **kwargs):
+                if not self._cacheavel():
+                    return self._privada(await view(*args, **kwargs))
+
+                chave = self._chave(tabelas)
+                backend = self._backend()
+                entrada = backend.get(chave)
+                if entrada is None:
+                    resposta = self.app.make_response(await view(*args, **kwargs))
+                    if resposta.status_code != 200 or resposta.direct_passthrough or session.modified:
+                        return self._privada(resposta)
+                    entrada = self._entrada(resposta)
+                    backend.set(chave, entrada, ttl=self._ttl())
+                return self._servir(entrada)
+            return envolvida
+        return decorador
+
+    def _cacheavel(self):
+        return request.method in ("GET", "HEAD") and self.app.config["CACHE_PAGINAS"] \
+            and not self._sessao_pessoal()
+
+    def _chave(self, tabelas):
+        return "pagina:" + hashlib.sha1(
+            "|".join([request.full_path] + self.versoes(tabelas)).encode()).hexdigest()
+
+    def _ttl(self):
+        # g.ttl_paginas: a view leu dado que pode estar atrasado (réplica) e encurta o TTL
+        ttl = self.app.config["CACHE_PAGINAS_TTL"]
+        return min(ttl, g.get("ttl_paginas", ttl))
+
+    def _guardar_ao_final(self, blocos, chave, mimetype, ttl):
+        partes = []
+        for bloco in blocos:
+            partes.append(bloco if isinstance(bloco, bytes) else bloco.encode())
+            yield bloco
+        # só chega aqui se o corpo foi enviado inteiro
+        resposta = Response(b"".join(partes), mimetype=mimetype)
+        self._backend().set(chave, self._entrada(resposta), ttl=ttl)
+
+    def _sessao_pessoal(self):
+        # sem cookie de sessão não há flash nem login; e não tocar na sessão evita o Vary: Cookie
+        if self.app.config["SESSION_COOKIE_NAME"] not in request.cookies:
+            return False
+        return bool(session.get("_flashes") or session.get("usuario_id"))
+
+    def _privada(self, retorno):
+        resposta = self.app.make_response(retorno)
+        resposta.headers.setdefault("Cache-Control", "private, no-store")
+        return resposta
+
+    @staticmethod
+    def _entrada(resposta):
+        corpo = resposta.get_data()
+        entrada = {
+            "corpo": corpo,
+            "mimetype": resposta.mimetype,
+            "etag": hashlib.sha1(corpo).hexdigest()[:32],
+        }
+        if len(corpo) >= COMPRIMIR_A_PARTIR_DE:
+            entrada["gzip"] = gzip.compress(corpo, 6)
+            if brotli is not None:
+                entrada["br"] = brotli.compress(corpo, quality=5)
+        return entrada
+
+    def _servir(self, entrada):
+        max_age = self.app.config["CACHE_PAGINAS_MAX_AGE"]
+        if request.if_none_match.contains_weak(entrada["etag"]):
+            resposta = Response(status=304)
+        else:
+            codificacao = next((c for c in ("br", "gzip")
+                                if c in entrada and c in request.accept_encodings), None)
+            resposta = Response(entrada[codificacao] if codificacao else entrada["corpo"],
+                                mimetype=entrada["mimetype"])
+            if codificacao:
+                resposta.headers["Content-Encoding"] = codificacao
+        resposta.set_etag(entrada["etag"], weak=True)
+        resposta.vary.add("Accept-Encoding")
+        # sem max-age o proxy guarda mas revalida sempre (um 304 barato daqui)
+        resposta.headers["Cache-Control"] = f"public, max-age={max_age}" if max_age else "public, no-cache"
+        return resposta
@@ -0,0 +1,182 @@
+"""Instrumentação por requisição: latência, SQL, templates e objetos ORM carregados.
+
+Liga-se aos eventos do SQLAlchemy (cursor execute, ORM load) e ao ciclo de
+vida do Flask, acumula por endpoint e exporta no formato texto do Prometheus.
+O evento "load" só vê instâncias de modelos: linhas lidas com select() de
+colunas (Core) não entram em ecommerce_orm_objects_loaded_total, só em
+ecommerce_sql_queries_per_request.
+Os números são por processo; com vários workers cada um expõe os seus.
+"""
+import logging
+import threading
+import time
+from bisect import bisect_left
+
+from flask import g, has_request_context, request, template_rendered, before_render_template
+from flask.signals import signals_available
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+log = logging.getLogger(__name__)
+
+BUCKETS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_CONSULTAS = (1, 2, 3, 5, 10, 20, 50, 100, 250)
+
+
+class Histograma:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.contagens = [0] * (len(buckets) + 1)  # último = +Inf
+        self.soma = 0.0
+        self.total = 0
+
+    def observar(self, valor):
+        self.contagens[bisect_left(self.buckets, valor)] += 1
+        self.soma += valor
+        self.total += 1
+
+    def linhas(self, nome, rotulos):
+        acumulado = 0
+        for limite, n in zip(self.buckets, self.contagens):
+            acumulado += n
+            yield f'{nome}_bucket{{{rotulos},le="{limite}"}} {acumulado}'
+        yield f'{nome}_bucket{{{rotulos},le="+Inf"}} {self.total}'
+        yield f"{nome}_sum{{{rotulos}}} {self.soma:.6f}"
+        yield f"{nome}_count{{{rotulos}}} {self.total}"
+
+
+class _PorEndpoint:
+    def __init__(self):
+        self.latencia = Histograma(BUCKETS_LATENCIA)
+        self.consultas = Histograma(BUCKETS_CONSULTAS)
+        self.tempo_sql = 0.0
+        self.tempo_template = 0.0
+        self.objetos = 0
+
+
+class Metricas:
+    """Registro em memória, protegido por lock, indexado por (endpoint, método)."""
+
+    def __init__(self):
+        self._dados = {}
+        self._lock = threading.Lock()
+        self.coletores_extras = []  # funções que devolvem linhas de texto extras
+
+    def registrar(self, endpoint, metodo, duracao, consultas, tempo_sql, tempo_template, objetos):
+        with self._lock:
+            m = self._dados.get((endpoint, metodo))
+            if m is None:
+                m = self._dados[(endpoint, metodo)] = _PorEndpoint()
+            m.latencia.observar(duracao)
+            m.consultas.observar(consultas)
+            m.tempo_sql += tempo_sql
+            m.tempo_template += tempo_template
+            m.objetos += objetos
+
+    def prometheus(self):
+        linhas = [
+            "# HELP ecommerce_http_request_duration_seconds Latência das requisições.",
+            "# TYPE ecommerce_http_request_duration_seconds histogram",
+        ]
+        with self._lock:
+            itens = sorted(self._dados.items())
+            for (endpoint, metodo), m in itens:
+                linhas.extend(m.latencia.linhas("ecommerce_http_request_duration_seconds",
+                                                f'endpoint="{endpoint}",method="{metodo}"'))
+            linhas += ["# HELP ecommerce_sql_queries_per_request Comandos SQL por requisição.",
+                       "# TYPE ecommerce_sql_queries_per_request histogram"]
+            for (endpoint, metodo), m in itens:
+                linhas.extend(m.consultas.linhas("ecommerce_sql_queries_per_request",
+                                                 f'endpoint="{endpoint}",method="{metodo}"'))
+            for nome, ajuda, atributo in (
+                ("ecommerce_sql_duration_seconds_total", "Tempo total em SQL.", "tempo_sql"),
+                ("ecommerce_template_render_seconds_total", "Tempo total renderizando templates.",
+                 "tempo_template"),
+                ("ecommerce_orm_objects_loaded_total",
+                 "Instâncias de modelos carregadas (linhas de consultas Core não contam).", "objetos"),
+            ):
+                linhas += [f"# HELP {nome} {ajuda}", f"# TYPE {nome} counter"]
+                for (endpoint, metodo), m in itens:
+                    valor = getattr(m, atributo)
+                    valor = valor if isinstance(valor, int) else f"{valor:.6f}"
+                    linhas.append(f'{nome}{{endpoint="{endpoint}",method="{metodo}"}} {valor}')
+        for coletor in self.coletores_extras:
+            linhas.extend(coletor())
+        return "\n".join(linhas) + "\n"
+
+
+def _contexto():
+    return g.get("_metricas") if has_request_context() else None
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _antes_sql(conn, cursor, statement, parameters, context, executemany):
+    conn.info["_inicio_sql"] = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _depois_sql(conn, cursor, statement, parameters, context, executemany):
+    m = _contexto()
+    if m is not None:
+        m["consultas"] += 1
+        m["tempo_sql"] += time.perf_counter() - conn.info.pop("_inicio_sql", time.perf_counter())
+
+
+def instrumentar(app, modelo_base, metricas):
+    """Registra os hooks no `app` e nos modelos derivados de `modelo_base`."""
+
+    @event.listens_for(modelo_base, "load", propagate=True)
+    def _objeto_carregado(target, context):
+        m = _contexto()
+        if m is not None:
+            m["objetos"] += 1
+
+    if signals_available:  # requer blinker
+        def _antes_template(sender, template, context, **extra):
+            m = _contexto()
+            if m is not None:
+                m["_inicio_template"] = time.perf_counter()
+
+        def _depois_template(sender, template, context, **extra):
+            m = _contexto()
+            if m is not None and "_inicio_template" in m:
+                m["tempo_template"] += time.perf_counter() - m.pop("_inicio_template")
+
+        before_render_template.connect(_antes_template, app, weak=False)
+        template_rendered.connect(_depois_template, app, weak=False)
+
+    @app.before_request
+    def _inicio_requisicao():
+        g._metricas = {"inicio": time.perf_counter(), "consultas": 0, "tempo_sql": 0.0,
+                       "tempo_template": 0.0, "objetos": 0}
+
+    def _fechar(m, endpoint, metodo, caminho, response=None):
+        duracao = time.perf_counter() - m["inicio"]
+        metricas.registrar(endpoint, metodo, duracao, m["consultas"],
+                           m["tempo_sql"], m["tempo_template"], m["objetos"])
+        if response is not None and app.config.get("METRICAS_CABECALHO"):
+            response.headers["X-SQL-Queries"] = str(m["consultas"])
+            response.headers["X-SQL-Time-ms"] = f"{1000 * m['tempo_sql']:.1f}"
+            response.headers["X-Request-Time-ms"] = f"{1000 * duracao:.1f}"
+        limite = app.config.get("METRICAS_LIMITE_CONSULTAS", 20)
+        if m["consultas"] > limite:
+            log.warning("%s %s emitiu %d comandos SQL (limite %d, %.1f ms em SQL)",
+                        metodo, caminho, m["consultas"], limite, 1000 * m["tempo_sql"])
+
+    @app.after_request
+    def _fim_requisicao(response):
+        if response.is_streamed:
+            # corpo em streaming (render_lista): as linhas ainda vão ser lidas do
+            # cursor, então o registro fica para o fechamento da resposta e
+            # g._metricas continua valendo até lá. Os cabeçalhos X-SQL-* já teriam
+            # saído antes dessas consultas e não são enviados.
+            m = g.get("_metricas")
+            if m is not None:
+                args = (m, request.endpoint or "sem_rota", request.method, request.path)
+                response.call_on_close(lambda: _fechar(*args))
+            return response
+        m = g.pop("_metricas", None)
+        if m is None:
+            return response
+        _fechar(m, request.endpoint or "sem_rota", request.method, request.path, response)
+        return response
@@ -0,0 +1,181 @@
+"""Leva um banco criado por uma versão anterior ao esquema dos modelos atuais.
+
+db.create_all() só cria as tabelas que faltam; colunas, índices e
+restrições únicas novos em tabelas que já existem ficam de fora. migrar()
+compara o metadata com o banco (inspector) e, numa transação por etapa:
+
+1. cria as tabelas que faltam;
+2. adiciona as colunas que faltam (ALTER TABLE ... ADD COLUMN). Coluna NOT
+   NULL sem server_default entra anulável, é preenchida por `preencher` e
+   só então vira NOT NULL (no SQLite, que não altera colunas, fica anulável;
+   a aplicação sempre a grava);
+3. cria os índices e as restrições únicas que faltam (como índice único) e
+   apaga os índices listados em `substituidos` (trocados por outros nos modelos);
+4. remove restrições únicas que os modelos não têm mais (no SQLite, a de
+   coluna só sai recriando a tabela, o que só é feito se nenhuma outra
+   tabela a referencia).
+
+Não muda tipos nem o ON DELETE de FKs existentes, e as colunas adicionadas
+não ganham FK. Rodar de novo num banco em dia não faz nada.
+"""
+import logging
+
+from sqlalchemy import Index, UniqueConstraint, inspect
+from sqlalchemy.schema import CreateColumn
+
+log = logging.getLogger(__name__)
+
+
+def migrar(engine, metadata, preencher=None, substituidos=()):
+    """Aplica as diferenças e devolve um relatório (dict de listas de nomes).
+
+    `preencher` mapeia "tabela.coluna" para o UPDATE (texto SQL) que preenche
+    a coluna recém-adicionada, rodado antes de ela virar NOT NULL.
+    `substituidos` são nomes de índices que não existem mais nos modelos; só
+    são apagados depois de criados os que os substituem.
+    """
+    preencher = preencher or {}
+    relatorio = {"tabelas": [], "colunas": [], "preenchidas": [], "indices": [], "indices_removidos": [],
+                 "unicas_removidas": []}
+
+    existentes = set(inspect(engine).get_table_names())
+    faltando = [t for t in metadata.sorted_tables if t.name not in existentes]
+    with engine.begin() as conn:
+        metadata.create_all(conn, tables=faltando)
+    relatorio["tabelas"] = [t.name for t in faltando]
+
+    for tabela in metadata.sorted_tables:
+        if tabela.name not in existentes:
+            continue
+        inspetor = inspect(engine)
+        atuais = {c["name"] for c in inspetor.get_columns(tabela.name)}
+        for coluna in tabela.columns:
+            if coluna.name in atuais:
+                continue
+            nome = f"{tabela.name}.{coluna.name}"
+            with engine.begin() as conn:
+                _adicionar_coluna(conn, coluna)
+                if nome in preencher:
+                    conn.exec_driver_sql(preencher[nome])
+                    relatorio["preenchidas"].append(nome)
+                if _adiada(coluna) and engine.dialect.name != "sqlite":
+                    _exigir_not_null(conn, coluna)
+            relatorio["colunas"].append(nome)
+
+        relatorio["indices"] += _criar_indices(engine, tabela)
+        relatorio["indices_removidos"] += _remover_indices(engine, tabela, substituidos)
+        relatorio["unicas_removidas"] += _remover_unicas_obsoletas(engine, tabela)
+    for chave, nomes in relatorio.items():
+        if nomes:
+            log.info("migração: %s: %s", chave, ", ".join(nomes))
+    return relatorio
+
+
+def _adiada(coluna):
+    """NOT NULL sem server_default: linhas existentes não teriam valor."""
+    return not coluna.nullable and coluna.server_default is None
+
+
+def _adicionar_coluna(conn, coluna):
+    q = conn.dialect.identifier_preparer.quote
+    if _adiada(coluna):
+        especificacao = f"{q(coluna.name)} {coluna.type.compile(dialect=conn.dialect)}"  # anulável, por ora
+    else:
+        especificacao = CreateColumn(coluna).compile(dialect=conn.dialect)
+    conn.exec_driver_sql(f"ALTER TABLE {q(coluna.table.name)} ADD COLUMN {especificacao}")
+
+
+def _exigir_not_null(conn, coluna):
+    q = conn.dialect.identifier_preparer.quote
+    tipo = coluna.type.compile(dialect=conn.dialect)
+    if conn.dialect.name == "mysql":
+        conn.exec_driver_sql(f"ALTER TABLE {q(coluna.table.name)} MODIFY {q(coluna.name)} {tipo} NOT NULL")
+    else:
+        conn.exec_driver_sql(f"ALTER TABLE {q(coluna.table.name)} ALTER COLUMN {q(coluna.name)} SET NOT NULL")
+
+
+def _unicas_do_modelo(tabela):
+    conjuntos = {frozenset(c.name for c in tabela.primary_key)}
+    for restricao in tabela.constraints:
+        if isinstance(restricao, UniqueConstraint):
+            conjuntos.add(frozenset(c.name for c in restricao.columns))
+    conjuntos |= {frozenset(c.name for c in i.columns) for i in tabela.indexes if i.unique}
+    return conjuntos
+
+
+def _criar_indices(engine, tabela):
+    inspetor = inspect(engine)
+    nomes = {i["name"] for i in inspetor.get_indexes(tabela.name)}
+    nomes |= {u["name"] for u in inspetor.get_unique_constraints(tabela.name) if u["name"]}
+    novos = [i for i in tabela.indexes if i.name not in nomes]
+    # restrição única nomeada que falta: um índice único faz o mesmo papel
+    novos += [Index(r.name, *r.columns, unique=True) for r in tabela.constraints
+              if isinstance(r, UniqueConstraint) and r.name and r.name not in nomes]
+    with engine.begin() as conn:
+        for indice in novos:
+            indice.create(conn)
+    return [i.name for i in novos]
+
+
+def _remover_indices(engine, tabela, nomes):
+    do_modelo = {i.name for i in tabela.indexes}
+    existentes = {i["name"] for i in inspect(engine).get_indexes(tabela.name)}
+    remover = [nome for nome in nomes if nome in existentes and nome not in do_modelo]
+    q = engine.dialect.identifier_preparer.quote
+    with engine.begin() as conn:
+        for nome in remover:
+            if engine.dialect.name == "mysql":
+                conn.exec_driver_sql(f"ALTER TABLE {q(tabela.name)} DROP INDEX {q(nome)}")
+            else:
+                conn.exec_driver_sql(f"DROP INDEX {q(nome)}")
+    return remover
+
+
+def _remover_unicas_obsoletas(engine, tabela):
+    inspetor = inspect(engine)
+    modelo = _unicas_do_modelo(tabela)
+    unicas = {}
+    for u in inspetor.get_unique_constraints(tabela.name):
+        unicas[u["name"]] = frozenset(u["column_names"])
+    for i in inspetor.get_indexes(tabela.name):
+        if i["unique"]:
+            unicas[i["name"]] = frozenset(i["column_names"])
+    obsoletas = {nome: colunas for nome, colunas in unicas.items() if colunas not in modelo}
+    if not obsoletas:
+        return []
+    q = engine.dialect.identifier_preparer.quote
+    with engine.begin() as conn:
+        if engine.dialect.name == "sqlite":
+            indices = {i["name"] for i in inspetor.get_indexes(tabela.name)}
+            if any(nome not in indices for nome in obsoletas):
+                # UNIQUE declarado no CREATE TABLE (sqlite_autoindex_*): não há DROP
+                _recriar_tabela_sqlite(conn, inspetor, tabela)
+                return [nome or f"{tabela.name}({', '.join(sorted(c))})" for nome, c in obsoletas.items()]
+        for nome in obsoletas:
+            if engine.dialect.name == "mysql":
+                conn.exec_driver_sql(f"ALTER TABLE {q(tabela.name)} DROP INDEX {q(nome)}")
+            elif engine.dialect.name == "sqlite":
+                conn.exec_driver_sql(f"DROP INDEX {q(nome)}")
+            else:
+                conn.exec_driver_sql(f"ALTER TABLE {q(tabela.name)} DROP CONSTRAINT IF EXISTS {q(nome)}")
+                conn.exec_driver_sql(f"DROP INDEX IF EXISTS {q(nome)}")
+    return list(obsoletas)
+
+
+def _recriar_tabela_sqlite(conn, inspetor, tabela):
+    """Renomeia, recria pelo modelo, copia as linhas e apaga a antiga."""
+    referenciada = [t for t in inspetor.get_table_names()
+                    if any(fk["referred_table"] == tabela.name for fk in inspetor.get_foreign_keys(t))]
+    if referenciada:
+        raise RuntimeError(f"{tabela.name} é referenciada por {', '.join(referenciada)}; "
+                           "recrie a restrição única manualmente")
+    q = conn.dialect.identifier_preparer.quote
+    antiga = f"_{tabela.name}_antiga"
+    colunas = ", ".join(q(c["name"]) for c in inspetor.get_columns(tabela.name)
+                        if c["name"] in tabela.columns)
+    for indice in inspetor.get_indexes(tabela.name):
+        conn.exec_driver_sql(f"DROP INDEX {q(indice['name'])}")
+    conn.exec_driver_sql(f"ALTER TABLE {q(tabela.name)} RENAME TO {q(antiga)}")
+    tabela.create(conn)
+    conn.exec_driver_sql(f"INSERT INTO {q(tabela.name)} ({colunas}) SELECT {colunas} FROM {q(antiga)}")
+    conn.exec_driver_sql(f"DROP TABLE {q(antiga)}")
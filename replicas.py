@@ -0,0 +1,271 @@
+"""Leituras em réplicas, escritas no primário.
+
+Requisições GET/HEAD leem de uma réplica escolhida por REPLICAS_POLITICA
+(rodizio, aleatoria ou menos_conexoes); todo o resto (POST, CLI, tarefas em
+segundo plano, flush do ORM e UPDATE/DELETE do Core) vai para o primário.
+Quem escreveu recebe um cookie que mantém suas leituras no primário por
+REPLICAS_JANELA segundos, então o redirect depois do POST já vê a escrita.
+
+Uma thread por processo grava um batimento (instante atual) no primário e o
+lê em cada réplica a cada REPLICAS_INTERVALO segundos: réplica que falha
+REPLICAS_FALHAS vezes seguidas, ou atrasada mais que REPLICAS_ATRASO_MAX
+segundos, sai do rodízio até se recuperar; sem réplica saudável tudo volta
+para o primário. Erro de conexão numa leitura tira a réplica na hora.
+
+Para testar numa máquina só, REPLICAS_REPLICADOR_FALSO copia o SQLite
+primário para as réplicas (API de backup do sqlite3) a cada
+REPLICAS_REPLICADOR_INTERVALO segundos; `flask replicar` faz o mesmo em
+primeiro plano.
+"""
+import atexit
+import itertools
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+from contextlib import closing
+
+from flask import g, has_request_context, request
+from flask_sqlalchemy import SignallingSession, SQLAlchemy
+from sqlalchemy import Column, Float, Integer, Table, create_engine, event, orm, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.sql.dml import UpdateBase
+
+from banco import opcoes_engine
+
+log = logging.getLogger(__name__)
+
+COOKIE = "primario_ate"
+POLITICAS = ("rodizio", "aleatoria", "menos_conexoes")
+
+
+class SessaoRoteada(SignallingSession):
+    """Sessão do Flask-SQLAlchemy que pergunta às Replicas do app qual engine usar."""
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        replicas = self.app.extensions.get("replicas")
+        if replicas is not None:
+            engine = replicas.rotear(escrita=self._flushing or isinstance(clause, UpdateBase))
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper, clause)
+
+
+class SQLAlchemyRoteado(SQLAlchemy):
+    def create_session(self, options):
+        return orm.sessionmaker(class_=SessaoRoteada, db=self, **options)
+
+
+class _Replica:
+    def __init__(self, url, engine):
+        self.url = url
+        self.engine = engine
+        self.saudavel = False  # só entra no rodízio depois da primeira checagem
+        self.falhas = 0
+        self.atraso = None
+        self.erro = None
+
+    @property
+    def nome(self):
+        return make_url(self.url).render_as_string(hide_password=True)
+
+
+class Replicas:
+    def __init__(self, app, db):
+        self.app = app
+        self.db = db
+        self.batimento = Table("batimento", db.metadata,
+                               Column("id", Integer, primary_key=True, autoincrement=False),
+                               Column("instante", Float, nullable=False))
+        self._replicas = []
+        self._pid = None
+        self._lock = threading.Lock()
+        self._vez = itertools.count()
+        self._parar = threading.Event()
+        self._threads = []
+        self._ultimo_batimento = None
+        app.extensions["replicas"] = self
+        app.before_request(self._antes)
+        app.after_request(self._depois)
+
+    @property
+    def ativas(self):
+        return bool(self.app.config["REPLICAS_URLS"])
+
+    # ---------- roteamento ----------
+
+    def rotear(self, escrita):
+        """Engine da réplica para esta leitura, ou None para usar o primário."""
+        if not has_request_context():
+            return None
+        if escrita:
+            g.escreveu_primario = True
+            return None
+        return g.get("replica")
+
+    def escolher(self):
+        saudaveis = [r for r in self._replicas if r.saudavel]
+        if not saudaveis:
+            return None
+        politica = self.app.config["REPLICAS_POLITICA"]
+        if politica == "aleatoria":
+            return random.choice(saudaveis)
+        if politica == "menos_conexoes":
+            return min(saudaveis, key=lambda r: r.engine.pool.checkedout()
+                       if hasattr(r.engine.pool, "checkedout") else 0)
+        return saudaveis[next(self._vez) % len(saudaveis)]
+
+    def _grudado(self):
+        try:
+            return float(request.cookies.get(COOKIE, 0)) > time.time()
+        except ValueError:
+            return False
+
+    def _antes(self):
+        if not self.ativas:
+            return
+        self.iniciar()
+        if request.method in ("GET", "HEAD") and not self._grudado():
+            replica = self.escolher()
+            if replica is not None:
+                g.replica = replica.engine
+                # pode estar até REPLICAS_ATRASO_MAX s atrás: a página não fica mais que isso no cache
+                g.ttl_paginas = self.app.config["REPLICAS_ATRASO_MAX"]
+
+    def _depois(self, resposta):
+        if g.get("escreveu_primario") and self.ativas:
+            janela = self.app.config["REPLICAS_JANELA"]
+            resposta.set_cookie(COOKIE, f"{time.time() + janela:.3f}", max_age=int(janela) + 1,
+                                httponly=True, samesite="Lax")
+        return resposta
+
+    # ---------- engines e saúde ----------
+
+    def iniciar(self):
+        """Cria os engines das réplicas e sobe a vigia (idempotente, seguro após fork)."""
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._replicas = []
+            for url in self.app.config["REPLICAS_URLS"]:
+                engine = create_engine(url, **opcoes_engine(dict(self.app.config, SQLALCHEMY_DATABASE_URI=url)))
+                replica = _Replica(url, engine)
+                event.listen(engine, "handle_error", self._ao_errar(replica))
+                self._replicas.append(replica)
+            self._parar.clear()
+            self._threads = [threading.Thread(target=self._vigiar, name="replicas-saude", daemon=True)]
+            if self.app.config["REPLICAS_REPLICADOR_FALSO"]:
+                replicador = ReplicadorFalso(self.app.config["SQLALCHEMY_DATABASE_URI"],
+                                             self.app.config["REPLICAS_URLS"])
+                self._threads.append(threading.Thread(
+                    target=replicador.rodar, args=(self.app.config["REPLICAS_REPLICADOR_INTERVALO"], self._parar),
+                    name="replicador-falso", daemon=True))
+            for t in self._threads:
+                t.start()
+        atexit.register(self.encerrar)
+
+    def encerrar(self):
+        self._parar.set()
+        for t in self._threads:
+            t.join(5)
+
+    def _ao_errar(self, replica):
+        def ao_errar(contexto):
+            # conexão perdida ou recusada: sai do rodízio já, sem esperar a vigia
+            if contexto.is_disconnect or contexto.connection is None:
+                self._marcar(replica, erro=str(contexto.original_exception), imediato=True)
+        return ao_errar
+
+    def _marcar(self, replica, erro=None, atraso=None, imediato=False):
+        if erro is not None:
+            replica.falhas += 1
+            replica.erro = erro
+            replica.atraso = None
+            if replica.saudavel and (imediato or replica.falhas >= self.app.config["REPLICAS_FALHAS"]):
+                log.warning("réplica %s fora do rodízio: %s", replica.nome, erro)
+                replica.saudavel = False
+            return
+        replica.falhas = 0
+        replica.erro = None
+        replica.atraso = atraso
+        saudavel = atraso <= self.app.config["REPLICAS_ATRASO_MAX"]
+        if saudavel != replica.saudavel:
+            log.warning("réplica %s %s (atraso %.1fs)", replica.nome,
+                        "de volta ao rodízio" if saudavel else "atrasada, fora do rodízio", atraso)
+        replica.saudavel = saudavel
+
+    def checar(self):
+        """Grava o batimento no primário e mede o atraso de cada réplica."""
+        agora = time.time()
+        t = self.batimento
+        with self.db.engine.begin() as conexao:
+            if not conexao.execute(t.update().where(t.c.id == 1).values(instante=agora)).rowcount:
+                conexao.execute(t.insert().values(id=1, instante=agora))
+        self._ultimo_batimento = agora
+        for replica in self._replicas:
+            try:
+                with replica.engine.connect() as conexao:
+                    visto = conexao.execute(select(t.c.instante).where(t.c.id == 1)).scalar()
+            except Exception as e:
+                self._marcar(replica, erro=f"{type(e).__name__}: {e}")
+                continue
+            if visto is None:
+                self._marcar(replica, erro="sem batimento (réplica ainda não sincronizou)")
+            else:
+                # atraso = quanto o último batimento visto está atrás do primeiro ainda não visto
+                self._marcar(replica, atraso=max(0.0, agora - visto - self.app.config["REPLICAS_INTERVALO"]))
+
+    def _vigiar(self):
+        intervalo = self.app.config["REPLICAS_INTERVALO"]
+        with self.app.app_context():
+            while True:
+                try:
+                    self.checar()
+                except Exception:
+                    log.exception("erro na checagem das réplicas")
+                if self._parar.wait(intervalo):
+                    return
+
+    def status(self):
+        """[(estado, engine)] de cada réplica deste processo."""
+        return [({"replica": r.nome, "saudavel": r.saudavel, "atraso_s": r.atraso,
+                  "falhas": r.falhas, "erro": r.erro}, r.engine) for r in self._replicas]
+
+    def metricas(self):
+        for r in self._replicas:
+            yield f'ecommerce_replica_saudavel{{replica="{r.nome}"}} {int(r.saudavel)}'
+            if r.atraso is not None:
+                yield f'ecommerce_replica_atraso_segundos{{replica="{r.nome}"}} {r.atraso:.3f}'
+
+
+class ReplicadorFalso:
+    """Mantém cópias de um SQLite em arquivo com a API de backup (só para testes)."""
+
+    def __init__(self, origem, destinos):
+        self.origem = self._caminho(origem)
+        self.destinos = [self._caminho(d) for d in destinos]
+
+    @staticmethod
+    def _caminho(url):
+        url = make_url(url)
+        if not url.drivername.startswith("sqlite") or not url.database or url.database == ":memory:":
+            raise ValueError(f"o replicador falso só copia SQLite em arquivo: {url}")
+        return url.database
+
+    def copiar(self):
+        with closing(sqlite3.connect(self.origem, timeout=30)) as origem:
+            for destino in self.destinos:
+                with closing(sqlite3.connect(destino, timeout=30)) as copia:
+                    origem.backup(copia)
+
+    def rodar(self, intervalo, parar):
+        while True:
+            try:
+                self.copiar()
+            except sqlite3.Error:
+                log.exception("replicador falso: cópia falhou, tenta de novo em %.1fs", intervalo)
+            if parar.wait(intervalo):
+                return
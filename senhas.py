@@ -0,0 +1,118 @@
+"""Hash de senhas com custo ajustável, calculado num pool limitado.
+
+O hash é o PBKDF2-SHA256 do werkzeug ("pbkdf2:sha256:<iterações>$sal$hash");
+SENHA_ITERACOES é o fator de trabalho. O cálculo roda num pool de
+SENHA_TRABALHADORES threads (o hashlib solta o GIL) ou processos
+(SENHA_POOL=processo), então um pico de cadastros não ocupa todas as CPUs
+nem trava as outras threads do worker. No máximo SENHA_FILA pedidos esperam
+vaga; além disso, ou passados SENHA_ESPERA segundos, levanta SenhasOcupadas.
+
+Hashes com parâmetros antigos (e senhas legadas em texto puro) são
+refeitos no login: verificar() devolve o hash novo para gravar.
+"""
+import atexit
+import hmac
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError as EsperaEsgotada
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+PREFIXO = "pbkdf2:"
+
+
+class SenhasOcupadas(Exception):
+    """Fila do pool de hash cheia: a requisição deve ser recusada (503)."""
+
+
+def e_hash(valor):
+    """True se `valor` já está no formato do werkzeug (e não em texto puro)."""
+    return bool(valor) and valor.startswith(PREFIXO) and valor.count("$") == 2
+
+
+class Senhas:
+    def __init__(self, app):
+        self.app = app
+        self._pool = None
+        self._pid = None
+        self._vagas = None
+        self._trabalhadores = 1
+        self._lock = threading.Lock()
+        self._ficticio = None
+
+    @property
+    def metodo(self):
+        return f"pbkdf2:sha256:{self.app.config['SENHA_ITERACOES']}"
+
+    def _executor(self):
+        with self._lock:
+            if self._pool is None or self._pid != os.getpid():
+                trabalhadores = self.app.config["SENHA_TRABALHADORES"] or os.cpu_count() or 1
+                classe = ProcessPoolExecutor if self.app.config["SENHA_POOL"] == "processo" \
+                    else ThreadPoolExecutor
+                self._pool = classe(max_workers=trabalhadores)
+                self._vagas = threading.BoundedSemaphore(trabalhadores + self.app.config["SENHA_FILA"])
+                self._trabalhadores = trabalhadores
+                self._pid = os.getpid()
+                atexit.register(self._pool.shutdown, wait=False)
+            return self._pool, self._vagas
+
+    def _submeter(self, funcao, *args):
+        """Espera uma vaga (até SENHA_ESPERA) e manda o cálculo para o pool."""
+        pool, vagas = self._executor()
+        if not vagas.acquire(timeout=self.app.config["SENHA_ESPERA"]):
+            raise SenhasOcupadas("muitos cálculos de senha em andamento")
+        try:
+            futuro = pool.submit(funcao, *args)
+        except Exception:
+            vagas.release()
+            raise
+        # a vaga só volta quando o cálculo termina, mesmo se desistirmos de esperar
+        futuro.add_done_callback(lambda _: vagas.release())
+        return futuro
+
+    def _esperar(self, futuro):
+        try:
+            return futuro.result(self.app.config["SENHA_ESPERA"])
+        except EsperaEsgotada:
+            raise SenhasOcupadas("cálculo de senha demorou demais")
+
+    def _rodar(self, funcao, *args):
+        return self._esperar(self._submeter(funcao, *args))
+
+    def gerar(self, senha):
+        return self._rodar(generate_password_hash, senha, self.metodo)
+
+    def gerar_varios(self, senhas):
+        """Hash de uma lista inteira (importação, API em lote).
+
+        Cada item passa pela mesma admissão de gerar(), e no máximo um item
+        por trabalhador do pool fica em andamento: o lote não toma as vagas
+        da fila dos logins e cadastros que chegarem enquanto ele roda.
+        """
+        self._executor()  # cria o pool (e self._trabalhadores) neste processo
+        futuros = []
+        for n, senha in enumerate(senhas):
+            if n >= self._trabalhadores:
+                self._esperar(futuros[n - self._trabalhadores])
+            futuros.append(self._submeter(generate_password_hash, senha, self.metodo))
+        return [self._esperar(futuro) for futuro in futuros]
+
+    def precisa_refazer(self, guardada):
+        return not e_hash(guardada) or guardada.split("$", 1)[0] != self.metodo
+
+    def verificar(self, guardada, senha):
+        """Devolve (confere, hash_novo); hash_novo só vem quando é preciso regravar."""
+        if guardada is None:
+            # e-mail inexistente: gasta o mesmo tempo para não revelar quais existem
+            if self._ficticio is None or self.precisa_refazer(self._ficticio):
+                self._ficticio = self.gerar(os.urandom(16).hex())
+            self._rodar(check_password_hash, self._ficticio, senha)
+            return False, None
+        if e_hash(guardada):
+            confere = self._rodar(check_password_hash, guardada, senha)
+        else:
+            confere = hmac.compare_digest(guardada.encode(), senha.encode())
+        if confere and self.precisa_refazer(guardada):
+            return True, self.gerar(senha)
+        return confere, None
@@ -0,0 +1,70 @@
+"""JSON rápido para a API e validação condicional (ETag / Last-Modified).
+
+Usa `orjson` quando instalado (dependência opcional) e cai no `json` da
+biblioteca padrão. Decimal sai como string ("10.50") para não perder
+precisão no cliente; datas em ISO 8601.
+"""
+import hashlib
+import json
+from datetime import date, datetime, timezone
+from decimal import Decimal
+
+from flask import Response, request
+
+try:
+    import orjson  # dependência opcional
+except ImportError:
+    orjson = None
+
+MIMETYPE = "application/json"
+
+
+def _padrao(obj):
+    if isinstance(obj, Decimal):
+        return str(obj)
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    raise TypeError(f"{type(obj).__name__} não é serializável em JSON")
+
+
+def dumps(dados):
+    """Serializa para bytes UTF-8."""
+    if orjson is not None:
+        return orjson.dumps(dados, default=_padrao)
+    return json.dumps(dados, default=_padrao, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def etag_de(*partes):
+    """ETag (fraca) a partir de uma representação estável das versões das linhas."""
+    return hashlib.sha1(repr(partes).encode()).hexdigest()[:32]
+
+
+def em_utc(momento):
+    """Datas sem fuso (atualizado_em é gravado com datetime.now) são hora local."""
+    return momento.astimezone(timezone.utc)
+
+
+def nao_modificado(etag, ultima_modificacao=None):
+    """True se o cliente já tem esta versão (If-None-Match tem precedência).
+
+    `ultima_modificacao` só deve ser passada quando é um limite superior real
+    das mudanças do recurso.
+    """
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if request.if_modified_since and ultima_modificacao:
+        return em_utc(ultima_modificacao).replace(microsecond=0) <= request.if_modified_since
+    return False
+
+
+def resposta_json(dados, status=200, etag=None, ultima_modificacao=None):
+    """Response JSON; com `dados` None devolve 304 (só os validadores)."""
+    if dados is None:
+        resposta = Response(status=304)
+    else:
+        resposta = Response(dumps(dados), status=status, mimetype=MIMETYPE)
+    if etag:
+        resposta.set_etag(etag, weak=True)
+    if ultima_modificacao:
+        resposta.last_modified = em_utc(ultima_modificacao)
+    return resposta
@@ -0,0 +1,39 @@
+// Campos de busca sob demanda: substituem os <select> com a tabela inteira.
+// Uso: <input data-typeahead="/api/usuarios/search" data-alvo="usuario_id" list="...">
+// O rótulo termina em "#<id>"; o id vai para o <input type="hidden"> alvo,
+// mantendo o nome de campo que o backend já espera (usuario_id, anuncio_id, uso).
+(function () {
+  function rotulo(item) {
+    var texto = item.nome || item.titulo;
+    if (item.email) texto += " (" + item.email + ")";
+    return texto + " #" + item.id;
+  }
+
+  document.querySelectorAll("input[data-typeahead]").forEach(function (campo) {
+    var alvo = document.getElementById(campo.dataset.alvo);
+    var lista = document.getElementById(campo.getAttribute("list"));
+    var timer = null;
+
+    campo.addEventListener("input", function () {
+      var m = campo.value.match(/#(\d+)$/);
+      alvo.value = m ? m[1] : "";
+      if (m) return;
+
+      clearTimeout(timer);
+      timer = setTimeout(function () {
+        var q = campo.value.trim();
+        if (!q) { lista.innerHTML = ""; return; }
+        fetch(campo.dataset.typeahead + "?limit=10&q=" + encodeURIComponent(q))
+          .then(function (r) { return r.json(); })
+          .then(function (itens) {
+            lista.innerHTML = "";
+            itens.forEach(function (item) {
+              var opt = document.createElement("option");
+              opt.value = rotulo(item);
+              lista.appendChild(opt);
+            });
+          });
+      }, 150);
+    });
+  });
+})();
@@ -0,0 +1,277 @@
+"""Fila de tarefas em segundo plano, persistida numa tabela do próprio banco.
+
+Cada processo roda um número fixo de threads que reservam tarefas com um
+UPDATE condicional (status pendente -> executando), então vários workers do
+gunicorn podem consumir a mesma tabela sem executar a mesma tarefa duas
+vezes. Falhas são repetidas com espera exponencial até `max_tentativas`.
+No encerramento do processo as threads param de reservar e terminam a
+tarefa corrente (até TAREFAS_DRENAGEM segundos); o que ficar pendente é
+pego pelo próximo processo. Enquanto uma tarefa roda, uma thread do
+processo renova `renovado_em` a cada TAREFAS_LEASE/3 segundos; só uma
+tarefa presa em "executando" sem renovação por TAREFAS_LEASE segundos
+(processo morto no meio) volta a ser reservável, e apenas se ainda tem
+tentativas; senão é marcada como falha.
+"""
+import atexit
+import json
+import logging
+import os
+import socket
+import threading
+from datetime import datetime, timedelta
+
+log = logging.getLogger(__name__)
+
+PENDENTE = "pendente"
+EXECUTANDO = "executando"
+CONCLUIDA = "concluida"
+FALHOU = "falhou"
+FINAIS = (CONCLUIDA, FALHOU)
+
+
+class FilaTarefas:
+    """Registro de funções + pool de threads que executa as linhas de `modelo`."""
+
+    def __init__(self, app, db, modelo):
+        self.app = app
+        self.db = db
+        self.modelo = modelo
+        self._funcoes = {}
+        self._threads = []
+        self._pid = None
+        self._parar = threading.Event()
+        self._acordar = threading.Event()
+        self._lock = threading.Lock()
+        self._progresso = {}  # id -> texto, só das tarefas rodando neste processo
+        self._renovador = None
+
+    def tarefa(self, nome):
+        """Decorador: registra `funcao(progresso, **args)` sob `nome`.
+
+        `progresso(texto)` publica o andamento; o retorno (serializável em
+        JSON) fica em `resultado`.
+        """
+        def registrar(funcao):
+            self._funcoes[nome] = funcao
+            return funcao
+        return registrar
+
+    def enfileirar(self, nome, descricao=None, tentativas=None, **args):
+        """Grava a tarefa (com commit) e acorda os trabalhadores. Devolve o id."""
+        if nome not in self._funcoes:
+            raise KeyError(f"tarefa desconhecida: {nome}")
+        tarefa = self.modelo(
+            nome=nome,
+            descricao=descricao or nome,
+            args=json.dumps(args),
+            status=PENDENTE,
+            tentativas=0,
+            max_tentativas=tentativas or self.app.config["TAREFAS_TENTATIVAS"],
+            executar_apos=datetime.now(),
+        )
+        self.db.session.add(tarefa)
+        self.db.session.commit()
+        if self.app.config["TAREFAS_EMBUTIDAS"]:
+            self.iniciar()
+        self._acordar.set()
+        return tarefa.id
+
+    def enfileirar_unica(self, nome, descricao=None):
+        """Enfileira `nome` sem argumentos se não há uma pendente ou executando.
+
+        Usa uma conexão própria: pode ser chamada no meio da transação de
+        outra pessoa sem confirmá-la. Devolve True se enfileirou.
+        """
+        if nome not in self._funcoes:
+            raise KeyError(f"tarefa desconhecida: {nome}")
+        t = self.modelo.__table__
+        ja_existe = self.db.select(t.c.id).where(t.c.nome == nome, t.c.status.in_((PENDENTE, EXECUTANDO)))
+        with self.db.engine.begin() as conn:
+            if conn.execute(ja_existe.limit(1)).first():
+                return False
+            conn.execute(t.insert().values(nome=nome, descricao=descricao or nome, args="{}", status=PENDENTE,
+                                           tentativas=0, max_tentativas=self.app.config["TAREFAS_TENTATIVAS"],
+                                           executar_apos=datetime.now()))
+        if self.app.config["TAREFAS_EMBUTIDAS"]:
+            self.iniciar()
+        self._acordar.set()
+        return True
+
+    def progresso(self, tarefa_id):
+        return self._progresso.get(tarefa_id)
+
+    # ---------- trabalhadores ----------
+
+    def iniciar(self, trabalhadores=None):
+        """Sobe as threads deste processo (idempotente, seguro após fork)."""
+        with self._lock:
+            if self._pid == os.getpid() and any(t.is_alive() for t in self._threads):
+                return
+            self._pid = os.getpid()
+            self._parar.clear()
+            n = trabalhadores or self.app.config["TAREFAS_TRABALHADORES"]
+            self._threads = [
+                threading.Thread(target=self._trabalhar, name=f"tarefas-{i}", daemon=True)
+                for i in range(n)
+            ]
+            for t in self._threads:
+                t.start()
+            self._renovador = threading.Thread(target=self._renovar_periodicamente, name="tarefas-lease",
+                                               daemon=True)
+            self._renovador.start()
+        atexit.register(self.encerrar)
+
+    def encerrar(self, timeout=None):
+        """Drena: não reserva mais nada e espera a tarefa corrente de cada thread."""
+        self._parar.set()
+        self._acordar.set()
+        if timeout is None:
+            timeout = self.app.config["TAREFAS_DRENAGEM"]
+        for t in self._threads:
+            t.join(timeout)
+            if t.is_alive():
+                log.warning("%s não terminou em %.0fs; a tarefa volta para a fila após o lease",
+                            t.name, timeout)
+
+    def _trabalhar(self):
+        intervalo = self.app.config["TAREFAS_INTERVALO"]
+        with self.app.app_context():
+            while not self._parar.is_set():
+                try:
+                    tarefa_id = self._reservar()
+                except Exception:
+                    log.exception("erro ao reservar tarefa")
+                    self.db.session.rollback()
+                    tarefa_id = None
+                if tarefa_id is None:
+                    self._acordar.wait(intervalo)
+                    self._acordar.clear()
+                    continue
+                try:
+                    self._executar(tarefa_id)
+                except Exception:
+                    log.exception("erro ao gravar o estado da tarefa %s", tarefa_id)
+                    self.db.session.rollback()
+                finally:
+                    self.db.session.remove()
+
+    @staticmethod
+    def _dono():
+        return f"{socket.gethostname()}:{os.getpid()}"
+
+    def _renovar_periodicamente(self):
+        intervalo = self.app.config["TAREFAS_LEASE"] / 3
+        with self.app.app_context():
+            while not self._parar.wait(intervalo):
+                try:
+                    self._renovar()
+                except Exception:
+                    log.exception("erro ao renovar o lease das tarefas")
+
+    def _renovar(self):
+        """Adia o vencimento do lease das tarefas que este processo está executando."""
+        ids = list(self._progresso)
+        if not ids:
+            return
+        m = self.modelo
+        with self.db.engine.begin() as conn:  # fora da sessão: não se mistura com a da tarefa
+            conn.execute(self.db.update(m.__table__)
+                         .where(m.id.in_(ids), m.status == EXECUTANDO, m.dono == self._dono())
+                         .values(renovado_em=datetime.now()))
+
+    def _lease_vencido(self, agora):
+        m = self.modelo
+        vencida = agora - timedelta(seconds=self.app.config["TAREFAS_LEASE"])
+        return self.db.and_(m.status == EXECUTANDO,
+                            self.db.func.coalesce(m.renovado_em, m.iniciado_em) < vencida)
+
+    def _reservavel(self, agora):
+        m = self.modelo
+        return self.db.or_(
+            self.db.and_(m.status == PENDENTE, m.executar_apos <= agora),
+            self.db.and_(self._lease_vencido(agora), m.tentativas < m.max_tentativas),
+        )
+
+    def _reservar(self):
+        """Pega a próxima tarefa vencida; o UPDATE condicional evita reservas duplas."""
+        m = self.modelo
+        sessao = self.db.session
+        # processo morto na última tentativa: não roda de novo (importações não são idempotentes)
+        agora = datetime.now()
+        sessao.query(m).filter(self._lease_vencido(agora), m.tentativas >= m.max_tentativas).update({
+            m.status: FALHOU,
+            m.erro: "o processo que executava a tarefa parou de renovar o lease",
+            m.concluido_em: agora,
+        }, synchronize_session=False)
+        sessao.commit()
+        while True:
+            agora = datetime.now()
+            candidato = (sessao.query(m.id).filter(self._reservavel(agora))
+                         .order_by(m.executar_apos, m.id).limit(1).scalar())
+            if candidato is None:
+                sessao.rollback()
+                return None
+            reservou = sessao.query(m).filter(m.id == candidato, self._reservavel(agora)).update({
+                m.status: EXECUTANDO,
+                m.iniciado_em: agora,
+                m.renovado_em: agora,
+                m.dono: self._dono(),
+                m.tentativas: m.tentativas + 1,
+            }, synchronize_session=False)
+            sessao.commit()
+            if reservou:
+                return candidato
+
+    def _executar(self, tarefa_id):
+        sessao = self.db.session
+        tarefa = sessao.get(self.modelo, tarefa_id)
+        funcao = self._funcoes.get(tarefa.nome)
+        args = json.loads(tarefa.args or "{}")
+        self._progresso[tarefa_id] = None
+
+        def progresso(texto):
+            self._progresso[tarefa_id] = texto
+
+        try:
+            if funcao is None:
+                raise KeyError(f"tarefa desconhecida: {tarefa.nome}")
+            resultado = funcao(progresso=progresso, **args)
+        except Exception as e:
+            sessao.rollback()
+            log.exception("tarefa %s (%s) falhou na tentativa %s", tarefa_id, tarefa.nome, tarefa.tentativas)
+            tarefa = sessao.get(self.modelo, tarefa_id)
+            tarefa.erro = f"{type(e).__name__}: {e}"
+            if tarefa.tentativas < tarefa.max_tentativas:
+                espera = self.app.config["TAREFAS_ESPERA_BASE"] * 2 ** (tarefa.tentativas - 1)
+                tarefa.status = PENDENTE
+                tarefa.executar_apos = datetime.now() + timedelta(seconds=espera)
+            else:
+                tarefa.status = FALHOU
+                tarefa.concluido_em = datetime.now()
+        else:
+            tarefa = sessao.get(self.modelo, tarefa_id)
+            tarefa.status = CONCLUIDA
+            tarefa.resultado = json.dumps(resultado, default=str)
+            tarefa.erro = None
+            tarefa.concluido_em = datetime.now()
+        finally:
+            tarefa.progresso = self._progresso.pop(tarefa_id, None)
+        sessao.commit()
+
+
+def como_dict(tarefa, progresso=None):
+    """Representação JSON de uma linha da tabela de tarefas."""
+    return {
+        "id": tarefa.id,
+        "nome": tarefa.nome,
+        "descricao": tarefa.descricao,
+        "status": tarefa.status,
+        "tentativas": tarefa.tentativas,
+        "max_tentativas": tarefa.max_tentativas,
+        "progresso": progresso or tarefa.progresso,
+        "resultado": json.loads(tarefa.resultado) if tarefa.resultado else None,
+        "erro": tarefa.erro,
+        "criado_em": tarefa.criado_em.isoformat() if tarefa.criado_em else None,
+        "iniciado_em": tarefa.iniciado_em.isoformat() if tarefa.iniciado_em else None,
+        "concluido_em": tarefa.concluido_em.isoformat() if tarefa.concluido_em else None,
+    }
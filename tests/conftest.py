@@ -0,0 +1,80 @@
+import os
+import sys
+from decimal import Decimal
+
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+os.environ.setdefault("SENHA_ITERACOES", "1000")
+os.environ.setdefault("TAREFAS_EMBUTIDAS", "0")
+
+import ecommerce  # noqa: E402
+
+
+@pytest.fixture
+def app(tmp_path):
+    salvo = dict(ecommerce.app.config)  # o app é global: cada teste devolve a config como achou
+    app = ecommerce.create_app({
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'ecommerce.db'}",
+        "BUSCA_INDICE": str(tmp_path / "busca.idx"),
+        "TAREFAS_DIR": str(tmp_path / "importacoes"),
+        "CACHE_PAGINAS": False,
+        "TESTING": True,
+    })
+    with app.app_context():
+        ecommerce.db.engine.dispose()  # engine do teste anterior apontava para outro arquivo
+        ecommerce.db.create_all()
+    yield app
+    with app.app_context():
+        ecommerce.db.session.remove()
+        ecommerce.db.engine.dispose()
+    app.config.clear()
+    app.config.update(salvo)
+
+
+@pytest.fixture
+def cliente(app):
+    return app.test_client()
+
+
+def entrar(cliente, nome):
+    resposta = cliente.post("/login", data={"email": f"{nome.lower()}@x", "passwd": "123456"})
+    assert resposta.headers["Location"].endswith("/"), "login falhou"
+
+
+@pytest.fixture
+def semeado(cliente):
+    """Ana vende três anúncios (categoria 1) e Bia, que fica logada, comprou de cada um."""
+    for nome in ("Ana", "Bia"):
+        cliente.post("/usuario/criar", data={"user": nome, "email": f"{nome.lower()}@x", "passwd": "123456"})
+    for nome in ("Livros", "Jogos"):
+        cliente.post("/config/categoria", data={"nome": nome})
+    entrar(cliente, "Ana")
+    for i in range(3):
+        cliente.post("/cad/anuncios", data={"nome": f"Livro {i}", "desc": "bom", "preco": "10,50",
+                                            "cat": "1", "estoque": "100"})
+    entrar(cliente, "Bia")
+    for i in range(3):
+        cliente.post("/anuncios/compra", data={"anuncio_id": str(i + 1), "quantidade": "2"})
+    cliente.get("/")  # consome os avisos (flash)
+    return cliente
+
+
+@pytest.fixture
+def confere_resumo(app):
+    """Compara resumo_venda mantido pelas rotas com o refeito por reconstruir_resumo()."""
+    def baldes():
+        return sorted(
+            (r.dimensao, r.periodo, r.chave, r.inicio, r.unidades, Decimal(r.receita).quantize(Decimal("0.01")))
+            for r in ecommerce.ResumoVenda.query.filter(ecommerce.ResumoVenda.unidades != 0)
+        )
+
+    def conferir():
+        with app.app_context():
+            incremental = baldes()
+            ecommerce.reconstruir_resumo()
+            assert incremental == baldes()
+            assert not ecommerce.ResumoVenda.query.filter(ecommerce.ResumoVenda.unidades < 0).count()
+            return incremental
+    return conferir
@@ -0,0 +1,36 @@
+from datetime import datetime, timezone
+
+from werkzeug.http import http_date, parse_date
+
+
+def test_lista_nao_manda_last_modified_e_muda_o_etag_ao_excluir(semeado):
+    resposta = semeado.get("/api/v1/anuncios")
+    assert resposta.status_code == 200 and "Last-Modified" not in resposta.headers
+    etag = resposta.headers["ETag"]
+    assert semeado.get("/api/v1/anuncios", headers={"If-None-Match": etag}).status_code == 304
+
+    semeado.post("/anuncio/deletar/3")
+    resposta = semeado.get("/api/v1/anuncios", headers={"If-None-Match": etag,
+                                                        "If-Modified-Since": http_date(datetime.now(timezone.utc))})
+    assert resposta.status_code == 200
+    assert [a["id"] for a in resposta.get_json()["dados"]] == [2, 1]
+
+
+def test_item_manda_last_modified_em_utc(semeado):
+    resposta = semeado.get("/api/v1/anuncios/1")
+    ultima = parse_date(resposta.headers["Last-Modified"])
+    assert abs((datetime.now(timezone.utc) - ultima).total_seconds()) < 120
+    depois = semeado.get("/api/v1/anuncios/1", headers={"If-Modified-Since": resposta.headers["Last-Modified"]})
+    assert depois.status_code == 304
+
+
+def test_compras_em_lote_invalidas_viram_erro_por_item(semeado):
+    resposta = semeado.post("/api/v1/compras", json=[
+        {"usuario_id": 2, "anuncio_id": "um"},
+        {"usuario_id": 2, "anuncio_id": 1, "chave_idempotencia": "x" * 65},
+        {"usuario_id": [2], "anuncio_id": 1},
+        {"usuario_id": 2, "anuncio_id": 1, "chave_idempotencia": "ok"},
+    ])
+    assert resposta.status_code == 201
+    resultados = resposta.get_json()["resultados"]
+    assert ["erro" in r for r in resultados] == [True, True, True, False]
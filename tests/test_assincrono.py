@@ -0,0 +1,57 @@
+import asyncio
+import json
+
+import pytest
+
+pytest.importorskip("aiosqlite")
+
+
+def _get(app_asgi, caminho):
+    """Uma requisição GET no app ASGI; devolve (status, corpo)."""
+    caminho, _, consulta = caminho.partition("?")
+    escopo = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+              "scheme": "http", "path": caminho, "raw_path": caminho.encode(), "root_path": "",
+              "query_string": consulta.encode(), "server": ("localhost", 80), "client": ("127.0.0.1", 1),
+              "headers": [(b"host", b"localhost")]}
+    enviados = []
+
+    async def receber():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def enviar(mensagem):
+        enviados.append(mensagem)
+
+    async def rodar():
+        await app_asgi(escopo, receber, enviar)
+
+    asyncio.run(rodar())
+    return enviados[0]["status"], b"".join(m.get("body", b"") for m in enviados[1:])
+
+
+@pytest.fixture
+def app_asgi(app):
+    import assincrono
+    app_asgi = assincrono.criar_app_asgi()
+    yield app_asgi
+    asyncio.run(assincrono.engine.dispose())  # as threads do aiosqlite seguram a saída
+    assincrono._threads.shutdown()
+
+
+def test_usuario_assincrono_pagina_como_o_sincrono(app, semeado, app_asgi):
+    semeado.cookie_jar.clear()
+    status, corpo = _get(app_asgi, "/cad/usuario?limit=1")
+    assert status == 200
+    assert b"Bia" in corpo and b"Ana" not in corpo
+    assert b"after=2" in corpo  # link da próxima página
+    assert corpo == semeado.get("/cad/usuario?limit=1").data
+
+    status, corpo = _get(app_asgi, "/cad/usuario?after=2&limit=1")
+    assert b"Ana" in corpo and b"Bia" not in corpo
+
+
+def test_busca_rapida_assincrona_igual_a_sincrona(app, semeado, app_asgi):
+    semeado.cookie_jar.clear()
+    status, corpo = _get(app_asgi, "/api/usuarios/search?q=A")
+    assert status == 200
+    assert json.loads(corpo) == semeado.get("/api/usuarios/search?q=A").get_json()
+    assert [u["nome"] for u in json.loads(corpo)] == ["Ana"]
@@ -0,0 +1,39 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.pool import StaticPool
+
+import banco
+from ecommerce import db
+
+CONFIG = {"DB_POOL_SIZE": 3, "DB_MAX_OVERFLOW": 1, "DB_POOL_TIMEOUT": 5, "DB_POOL_RECYCLE": 600,
+          "DB_POOL_PRE_PING": True, "SQLITE_BUSY_TIMEOUT": 7}
+
+
+@pytest.mark.parametrize("uri", ["sqlite://", "sqlite:///:memory:", "sqlite:///file:x?mode=memory&uri=true"])
+def test_sqlite_em_memoria_compartilha_uma_conexao(uri):
+    assert banco.opcoes_engine(dict(CONFIG, SQLALCHEMY_DATABASE_URI=uri))["poolclass"] is StaticPool
+
+
+def test_sqlite_em_arquivo_usa_pool_medido_e_busy_timeout():
+    opcoes = banco.opcoes_engine(dict(CONFIG, SQLALCHEMY_DATABASE_URI="sqlite:////tmp/x.db"))
+    assert opcoes["poolclass"] is banco.PoolMedido
+    assert opcoes["connect_args"] == {"check_same_thread": False, "timeout": 7}
+    assert "pool_pre_ping" not in opcoes
+
+
+def test_outros_bancos_recebem_as_chaves_db():
+    opcoes = banco.opcoes_engine(dict(CONFIG, SQLALCHEMY_DATABASE_URI="mysql+pymysql://u:s@h/db"))
+    assert opcoes == {"poolclass": banco.PoolMedido, "pool_size": 3, "max_overflow": 1,
+                      "pool_timeout": 5, "pool_recycle": 600, "pool_pre_ping": True}
+
+
+def test_pragmas_e_status_do_pool(app, cliente):
+    with app.app_context():
+        with db.engine.connect() as conn:
+            assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+            assert conn.execute(text("PRAGMA foreign_keys")).scalar() == 1
+    status = cliente.get("/debug/pool").get_json()
+    assert status["classe"] == "PoolMedido"
+    assert status["em_uso"] == 0
+    assert status["checkouts"] >= 1
+
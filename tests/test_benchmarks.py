@@ -0,0 +1,40 @@
+import argparse
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+import ecommerce  # noqa: E402
+import estatisticas  # noqa: E402
+import rotas  # noqa: E402
+import semear  # noqa: E402
+
+
+def test_resumir_percentis():
+    r = estatisticas.resumir([i / 1000 for i in range(1, 101)], duracao=2.0, erros=1)
+    assert (r["n"], r["erros"], r["req_s"]) == (100, 1, 50.0)
+    assert (r["p50_ms"], r["p95_ms"], r["p99_ms"], r["max_ms"]) == (51.0, 96.0, 100.0, 100.0)
+    assert estatisticas.resumir([], 0)["req_s"] == 0.0
+
+
+@pytest.fixture
+def banco_semeado(app):
+    with app.app_context():
+        E = ecommerce
+        semear.semear(E.db, (E.Usuario, E.Categoria, E.Anuncio, E.Compra, E.Pergunta),
+                      usuarios=20, anuncios=50, compras=100, perguntas=30, categorias=3, log=lambda *a: None)
+        E.reconstruir_resumo()
+        E.reconciliar_contadores()
+        E.reconstruir_facetas()
+        E.construir_indice_busca()
+    return app.config["SQLALCHEMY_DATABASE_URI"]
+
+
+@pytest.mark.parametrize("cenario", rotas.CENARIOS, ids=[c[0] for c in rotas.CENARIOS])
+def test_cenario_roda_sem_erros(banco_semeado, cenario):
+    args = argparse.Namespace(db=banco_semeado, iteracoes=2, aquecimento=0, semente=7)
+    resultado = rotas._medir(cenario, args)
+    assert (resultado["n"], resultado["erros"]) == (2, 0)
+
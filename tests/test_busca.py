@@ -0,0 +1,103 @@
+import json
+import os
+import threading
+
+import ecommerce
+from busca import IndiceInvertido
+
+
+def _ids(indice, consulta):
+    return {doc_id for doc_id, _ in indice.buscar(consulta)}
+
+
+def test_salvar_nao_perde_o_que_outro_processo_anexou(tmp_path):
+    caminho = str(tmp_path / "busca.idx")
+    a = IndiceInvertido(caminho)
+    a.carregar_em_lote([(1, "Livro velho", "", 1, 10)])
+    a.salvar()
+    b = IndiceInvertido(caminho)
+    assert b.carregar()
+
+    b.adicionar(2, "Camera nova", "", 1, 20)
+    a.salvar()  # roda o diário enquanto b ainda não viu o snapshot novo
+    # b anexa à geração que conhecia, como um worker que ainda não sincronizou
+    with open(b._diario(b._geracao), "a", encoding="utf-8") as f:
+        f.write(json.dumps({"op": "add", "id": 3, "titulo": "Camera usada", "descricao": "",
+                            "categoria_id": 1, "preco": "5"}) + "\n")
+
+    c = IndiceInvertido(caminho)
+    assert c.carregar()
+    assert _ids(c, "camera") == {2, 3}
+    assert _ids(a, "camera") == {2, 3}
+
+    b.remover(2)  # b sincroniza antes de anexar e grava na geração nova
+    assert _ids(a, "camera") == {3}
+    assert _ids(c, "camera") == {3}
+
+
+def test_salvar_apaga_diarios_antigos(tmp_path):
+    caminho = str(tmp_path / "busca.idx")
+    a = IndiceInvertido(caminho)
+    a.carregar_em_lote([(1, "Livro", "", 1, 10)])
+    for _ in range(4):
+        a.salvar()
+        a.adicionar(len(a) + 1, "Jogo", "", 2, 30)
+    diarios = sorted(f for f in os.listdir(tmp_path) if f.startswith("busca.idx.log."))
+    assert diarios == ["busca.idx.log.3", "busca.idx.log.4"]
+
+    b = IndiceInvertido(caminho)
+    assert b.carregar() and len(b) == len(a) == 5
+
+
+def test_diario_grande_pede_compactacao(tmp_path):
+    pedidos = []
+    caminho = str(tmp_path / "busca.idx")
+    a = IndiceInvertido(caminho, limite_diario=200, ao_passar_limite=lambda: pedidos.append(1))
+    a.carregar_em_lote([(1, "Livro", "", 1, 10)])
+    a.salvar()
+    for n in range(2, 10):
+        a.adicionar(n, "Jogo de tabuleiro", "", 2, 30)
+    assert pedidos == [1]  # uma vez por geração
+
+    b = IndiceInvertido(caminho)
+    assert b.carregar()
+    b.salvar()  # o que a tarefa compactar-busca faz
+    assert os.path.getsize(b._diario(b._geracao)) == 0
+    a.adicionar(10, "Jogo", "", 2, 30)
+    c = IndiceInvertido(caminho)
+    assert c.carregar() and len(c) == 10
+    assert pedidos == [1]
+
+
+def test_indice_busca_inicializa_uma_vez(app, monkeypatch):
+    construcoes = []
+    original = ecommerce.construir_indice_busca
+
+    def contar(*args, **kwargs):
+        construcoes.append(1)
+        return original(*args, **kwargs)
+    monkeypatch.setattr(ecommerce, "construir_indice_busca", contar)
+    monkeypatch.setattr(ecommerce, "_indice_busca", None)
+
+    def buscar():
+        with app.app_context():
+            ecommerce.indice_busca()
+    threads = [threading.Thread(target=buscar) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert construcoes == [1]
+
+
+def test_tarefa_compactar_busca(app, semeado):
+    with app.app_context():
+        app.config["BUSCA_DIARIO_MAX"] = 1
+        ecommerce._indice_busca = None
+        ecommerce.indice_busca().remover(3)
+        tarefa = ecommerce.Tarefa.query.filter_by(nome="compactar-busca").one()
+        assert not ecommerce.fila.enfileirar_unica("compactar-busca")
+        assert ecommerce.fila._reservar() == tarefa.id
+        ecommerce.fila._executar(tarefa.id)
+        assert ecommerce.db.session.get(ecommerce.Tarefa, tarefa.id).status == "concluida"
+        assert {i for i, _ in ecommerce.indice_busca().buscar("livro")} == {1, 2}
@@ -0,0 +1,33 @@
+import ecommerce
+from ecommerce import db
+
+
+def _plano(app, consulta_de, url):
+    with app.test_request_context(url):
+        consulta = consulta_de()
+        compilada = consulta.compile(db.engine)
+        with db.engine.connect() as conn:
+            linhas = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + str(compilada),
+                                          tuple(compilada.params[p] for p in compilada.positiontup))
+            return [linha[-1] for linha in linhas]
+
+
+def test_usuarios_usam_os_indices_de_prefixo(app):
+    plano = _plano(app, ecommerce.consulta_usuarios_prefixo, "/api/usuarios/search?q=an")
+    texto = "\n".join(plano)
+    assert "ix_usuario_nome_prefixo" in texto
+    assert "ix_usuario_email_prefixo" in texto
+    assert not any(passo.startswith("SCAN usuario") for passo in plano), texto
+
+
+def test_anuncios_usam_o_indice_de_prefixo(app):
+    plano = _plano(app, ecommerce.consulta_anuncios_prefixo, "/api/anuncios/search?q=li")
+    texto = "\n".join(plano)
+    assert "ix_anuncio_titulo_prefixo" in texto
+    assert not any(passo.startswith("SCAN anuncio") for passo in plano), texto
+
+
+def test_busca_nao_diferencia_maiusculas(semeado):
+    assert [u["nome"] for u in semeado.get("/api/usuarios/search?q=an").get_json()] == ["Ana"]
+    titulos = [a["titulo"] for a in semeado.get("/api/anuncios/search?q=LIVRO").get_json()]
+    assert len(titulos) == 3
@@ -0,0 +1,48 @@
+import pytest
+
+import cache
+import ecommerce
+
+
+def test_memoria_descarta_o_menos_usado_e_expira(monkeypatch):
+    c = cache.CacheMemoria(ttl=10, maxsize=2)
+    c.set("a", 1)
+    c.set("b", 2)
+    assert c.get("a") == 1  # "b" passa a ser o menos usado
+    c.set("c", 3)
+    assert (c.get("a"), c.get("b"), c.get("c")) == (1, None, 3)
+
+    agora = cache.time.monotonic()
+    monkeypatch.setattr(cache.time, "monotonic", lambda: agora + 11)
+    assert c.get("a") is None
+    assert c.stats() == {"backend": "memoria", "hits": 3, "misses": 2, "hit_ratio": 0.6, "itens": 1}
+
+
+def test_arquivo_compartilha_entre_instancias_e_expira(tmp_path, monkeypatch):
+    um, outro = cache.CacheArquivo(str(tmp_path), ttl=10), cache.CacheArquivo(str(tmp_path), ttl=10)
+    um.set("lista:categorias", [{"id": 1, "nome": "Livros"}])
+    assert outro.get("lista:categorias") == [{"id": 1, "nome": "Livros"}]
+    outro.delete("lista:categorias")
+    assert um.get("lista:categorias") is None
+
+    um.set("x", 1)
+    agora = cache.time.time()
+    monkeypatch.setattr(cache.time, "time", lambda: agora + 11)
+    assert outro.get("x") is None
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.parametrize("backend", ["memoria", "arquivo"])
+def test_lista_de_categorias_invalidada_no_commit(app, cliente, tmp_path, backend):
+    ecommerce.cache = cache.criar_cache(dict(app.config, CACHE_BACKEND=backend,
+                                             CACHE_DIR=str(tmp_path / "cache")))
+    cliente.post("/config/categoria", data={"nome": "Livros"})
+    with app.app_context():
+        assert [c["nome"] for c in ecommerce.listar_categorias()] == ["Livros"]
+        assert [c["nome"] for c in ecommerce.listar_categorias()] == ["Livros"]
+        assert ecommerce.cache.stats()["hits"] == 1
+
+    cliente.post("/categoria/editar/1", data={"nome": "Revistas"})
+    cliente.post("/config/categoria", data={"nome": "Jogos"})
+    with app.app_context():
+        assert [c["nome"] for c in ecommerce.listar_categorias()] == ["Jogos", "Revistas"]
@@ -0,0 +1,31 @@
+import ecommerce
+from ecommerce import Categoria, db
+
+
+def test_escrita_pelo_orm_e_pelo_core_renova_a_pagina(app, cliente):
+    app.config["CACHE_PAGINAS"] = True
+    cliente.post("/config/categoria", data={"nome": "Livros"})
+    cliente.get("/")  # consome o aviso: com flash a página não passa pelo cache
+    assert b"Livros" in cliente.get("/config/categoria").data
+
+    with app.app_context():
+        db.session.get(Categoria, 1).nome = "Revistas"
+        db.session.commit()
+    assert b"Revistas" in cliente.get("/config/categoria").data
+
+    with app.app_context():
+        with db.engine.begin() as conn:  # commit fora da Session (como migracoes.py)
+            conn.execute(Categoria.__table__.update().values(nome="Gibis"))
+    assert b"Gibis" in cliente.get("/config/categoria").data
+
+
+def test_rollback_nao_troca_a_versao(app):
+    with app.app_context():
+        antes = ecommerce.paginas.versoes(["categoria"])
+        with db.engine.connect() as conn:
+            with conn.begin() as transacao:
+                conn.execute(Categoria.__table__.insert().values(nome="Descartada"))
+                transacao.rollback()
+        db.session.add(Categoria(nome="Outra"))
+        db.session.rollback()
+        assert ecommerce.paginas.versoes(["categoria"]) == antes
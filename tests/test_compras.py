@@ -0,0 +1,44 @@
+import ecommerce
+from ecommerce import Compra, Tarefa, db, registrar_compra, resumir_pendentes
+
+
+def test_chave_de_idempotencia_vale_por_usuario(app, semeado):
+    with app.app_context():
+        primeira, criada = registrar_compra(1, 2, 1, "chave-1")
+        assert criada
+        assert registrar_compra(1, 2, 1, "chave-1") == (primeira, False)
+        outra, criada = registrar_compra(1, 1, 1, "chave-1")  # outro usuário, mesma chave
+        assert criada and outra != primeira
+
+
+def test_resumo_que_falha_fica_pendente_e_e_recuperado(app, semeado, monkeypatch, confere_resumo):
+    def falhar(deltas):
+        raise RuntimeError("banco fora")
+
+    with app.app_context():
+        monkeypatch.setattr(ecommerce, "aplicar_resumo", falhar)
+        compra_id, criada = registrar_compra(2, 1, 3)
+        monkeypatch.undo()
+        assert criada
+        assert db.session.get(Compra, compra_id).resumo_pendente
+        assert Tarefa.query.filter_by(nome="resumir-compras").count() == 1
+        # o estoque e os contadores do anúncio não esperam pelo resumo
+        assert db.session.get(ecommerce.Anuncio, 2).unidades_vendidas == 5
+
+        assert resumir_pendentes() == 1
+        assert resumir_pendentes() == 0
+    confere_resumo()
+
+
+def test_editar_e_excluir_compra_pendente(app, semeado, monkeypatch, confere_resumo):
+    with app.app_context():
+        monkeypatch.setattr(ecommerce, "aplicar_resumo", lambda deltas: 1 / 0)
+        editada, _ = registrar_compra(3, 1, 1)
+        excluida, _ = registrar_compra(3, 1, 1)
+        monkeypatch.undo()
+    semeado.post(f"/compras/editar/{editada}", data={"quantidade": "4"})
+    semeado.post(f"/compras/deletar/{excluida}")
+    with app.app_context():
+        assert not Compra.query.filter_by(resumo_pendente=True).count()
+        assert db.session.get(Compra, editada).quantidade == 4
+    confere_resumo()
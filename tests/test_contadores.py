@@ -0,0 +1,56 @@
+import re
+
+import ecommerce
+from ecommerce import Anuncio, db
+
+
+def contadores(app, anuncio_id=1):
+    with app.app_context():
+        a = db.session.get(Anuncio, anuncio_id)
+        return a.qtd_perguntas, a.qtd_sem_resposta, a.unidades_vendidas, float(a.receita)
+
+
+def reconciliados(app):
+    with app.app_context():
+        return ecommerce.reconciliar_contadores()
+
+
+def test_perguntas_e_compras_ajustam_os_contadores(app, semeado):
+    assert contadores(app) == (0, 0, 2, 21.0)
+    semeado.post("/anuncios/pergunta", data={"anuncio_id": "1", "texto": "tem capa dura?"})
+    semeado.post("/anuncios/pergunta", data={"anuncio_id": "1", "texto": "e a edição?"})
+    assert contadores(app)[:2] == (2, 2)
+
+    semeado.post("/pergunta/editar/1", data={"texto": "tem capa dura?", "resposta": "Sim."})
+    assert contadores(app)[:2] == (2, 1)
+    semeado.post("/pergunta/deletar/2")
+    assert contadores(app)[:2] == (1, 0)
+
+    semeado.post("/compras/editar/1", data={"quantidade": "5"})
+    assert contadores(app)[2:] == (5, 52.5)
+    semeado.post("/compras/deletar/1")
+    assert contadores(app)[2:] == (0, 0.0)
+    assert reconciliados(app) == (3, 0)
+
+
+def test_reconciliar_corrige_so_os_que_divergem(app, semeado):
+    with app.app_context():
+        db.session.execute(db.update(Anuncio).where(Anuncio.id == 2).values(unidades_vendidas=99, qtd_perguntas=4))
+        db.session.commit()
+    assert reconciliados(app) == (3, 1)
+    assert contadores(app, 2) == (0, 0, 2, 21.0)
+    assert reconciliados(app) == (3, 0)
+
+
+def test_ordenar_por_vendidos_percorre_o_cursor(app, semeado, monkeypatch):
+    monkeypatch.setitem(app.config, "LISTAS_STREAMING", False)
+    semeado.post("/anuncios/compra", data={"anuncio_id": "2", "quantidade": "3"})
+    semeado.post("/anuncios/compra", data={"anuncio_id": "3", "quantidade": "1"})
+
+    vistos, url = [], "/cad/anuncios?ordem=vendidos&limit=1"
+    while url:
+        html = semeado.get(url).get_data(as_text=True)
+        vistos += re.findall(r"Livro \d", html)[:1]
+        proxima = re.search(r'href="([^"]+)">Próxima página', html)
+        url = proxima and proxima.group(1).replace("&amp;", "&")
+    assert vistos == ["Livro 1", "Livro 2", "Livro 0"]  # 5, 3 e 2 unidades
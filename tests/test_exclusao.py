@@ -0,0 +1,94 @@
+import ecommerce
+
+
+def facetas():
+    return sorted((f.categoria_id, f.faixa, f.quantidade)
+                  for f in ecommerce.FacetaCategoria.query.filter(ecommerce.FacetaCategoria.quantidade != 0))
+
+
+def confere_derivados(app, confere_resumo):
+    """Resumo, contadores e facetas mantidos pelas rotas batem com os refeitos do zero."""
+    confere_resumo()
+    with app.app_context():
+        incremental = facetas()
+        ecommerce.reconstruir_facetas()
+        assert incremental == facetas()
+        assert ecommerce.reconciliar_contadores()[1] == 0
+
+
+def achados(app, consulta="livro", **filtros):
+    with app.app_context():
+        return {i for i, _ in ecommerce.indice_busca().buscar(consulta, **filtros)}
+
+
+def test_mesclar_categoria_move_resumo_facetas_e_busca(app, semeado, confere_resumo):
+    semeado.post("/categoria/mesclar", data={"origem": "1", "destino": "2"})
+
+    with app.app_context():
+        assert ecommerce.db.session.get(ecommerce.Categoria, 1) is None
+        assert {a.categoria_id for a in ecommerce.Anuncio.query} == {2}
+        assert {f[0] for f in facetas()} == {2}
+    confere_derivados(app, confere_resumo)
+    assert achados(app, categoria_id=2) == {1, 2, 3}
+    assert achados(app, categoria_id=1) == set()
+
+
+def test_deletar_categoria_move_para_sem_categoria(app, semeado, confere_resumo):
+    semeado.post("/categoria/deletar/1")
+
+    with app.app_context():
+        padrao = ecommerce.get_or_create_default_category().id
+        assert {a.categoria_id for a in ecommerce.Anuncio.query} == {padrao}
+    confere_derivados(app, confere_resumo)
+    assert achados(app, categoria_id=padrao) == {1, 2, 3}
+
+
+def test_excluir_comprador_desconta_vendas(app, semeado, confere_resumo):
+    semeado.post("/anuncios/pergunta", data={"anuncio_id": "1", "texto": "tem capa dura?"})
+    semeado.post("/usuario/deletar/2")
+
+    with app.app_context():
+        assert ecommerce.db.session.get(ecommerce.Usuario, 2) is None
+        anuncios = ecommerce.Anuncio.query.all()
+        assert [(a.unidades_vendidas, a.receita, a.qtd_perguntas) for a in anuncios] == [(0, 0, 0)] * 3
+    assert confere_resumo() == []
+    confere_derivados(app, confere_resumo)
+    assert achados(app) == {1, 2, 3}
+
+
+def test_excluir_vendedor_tira_anuncios_da_busca(app, semeado, confere_resumo):
+    semeado.post("/usuario/deletar/1")
+
+    with app.app_context():
+        assert ecommerce.Anuncio.query.count() == 0
+        assert ecommerce.Compra.query.count() == 0
+        assert facetas() == []
+    confere_derivados(app, confere_resumo)
+    assert achados(app) == set()
+
+
+def test_excluir_anuncio(app, semeado, confere_resumo):
+    semeado.post("/anuncio/deletar/1")
+
+    with app.app_context():
+        assert ecommerce.db.session.get(ecommerce.Anuncio, 1) is None
+        assert ecommerce.Compra.query.filter_by(anuncio_id=1).count() == 0
+    confere_derivados(app, confere_resumo)
+    assert achados(app) == {2, 3}
+
+
+def test_exclusao_logica_esconde_sem_apagar(app, semeado, confere_resumo, monkeypatch):
+    monkeypatch.setitem(app.config, "EXCLUSAO_LOGICA", True)
+    antes = confere_resumo()
+    semeado.post("/usuario/deletar/1")
+
+    with app.app_context():
+        ana = ecommerce.db.session.get(ecommerce.Usuario, 1)
+        assert ana.excluido_em is not None
+        assert all(a.excluido_em is not None for a in ecommerce.Anuncio.query)
+        assert ecommerce.Compra.query.count() == 3  # o histórico de vendas fica
+        assert facetas() == []
+    assert confere_resumo() == antes
+    confere_derivados(app, confere_resumo)
+    assert achados(app) == set()
+    assert semeado.get("/anuncio/deletar/2").status_code == 404
@@ -0,0 +1,81 @@
+import io
+import json
+import os
+
+import ecommerce
+from conftest import entrar
+from ecommerce import Tarefa, db, fila
+
+
+def _enviar(cliente, conteudo=b"nome,email,senha\nCaio,caio@x,123456\n"):
+    return cliente.post("/importar", data={"entidade": "usuarios",
+                                           "arquivo": (io.BytesIO(conteudo), "usuarios.csv")})
+
+
+def test_importacao_que_falha_apaga_o_arquivo(app, cliente, monkeypatch):
+    def falhar(caminho):
+        raise ValueError("arquivo ruim")
+    monkeypatch.setitem(ecommerce.IMPORTACOES, "usuarios", falhar)
+    assert _enviar(cliente).status_code == 302
+    assert len(os.listdir(app.config["TAREFAS_DIR"])) == 1
+    with app.app_context():
+        tarefa_id = fila._reservar()
+        fila._executar(tarefa_id)
+        tarefa = db.session.get(Tarefa, tarefa_id)
+        assert (tarefa.status, tarefa.erro) == ("falhou", "ValueError: arquivo ruim")
+    assert os.listdir(app.config["TAREFAS_DIR"]) == []
+
+
+def test_importacao_exige_tarefas_dir(app, cliente):
+    app.config["TAREFAS_DIR"] = None
+    resposta = _enviar(cliente)
+    assert resposta.status_code == 302
+    with app.app_context():
+        assert Tarefa.query.count() == 0
+    assert "TAREFAS_DIR" in cliente.get("/importar").get_data(as_text=True)
+
+
+def test_importar_compras_valida_ids(app, semeado, tmp_path):
+    arquivo = tmp_path / "compras.csv"
+    arquivo.write_text("usuario_id,anuncio_id,quantidade\n2,1,1\nx,1,1\n")
+    with app.app_context():
+        resultado = ecommerce.importar_compras(str(arquivo))
+        assert (resultado.inseridos, len(resultado.erros)) == (1, 1), str(resultado)
+
+
+def test_importar_compras_recusa_excluidos_e_nao_baixa_estoque(app, semeado, confere_resumo, tmp_path,
+                                                              monkeypatch):
+    monkeypatch.setitem(app.config, "EXCLUSAO_LOGICA", True)
+    semeado.post("/anuncio/deletar/3")
+    arquivo = tmp_path / "compras.csv"
+    arquivo.write_text("usuario_id,anuncio_id,quantidade\n2,1,5\n2,3,1\n9,1,1\n")
+    with app.app_context():
+        resultado = ecommerce.importar_compras(str(arquivo))
+        assert resultado.inseridos == 1, str(resultado)
+        assert [linha for linha, _ in resultado.erros] == [3, 4]
+        anuncio = db.session.get(ecommerce.Anuncio, 1)
+        assert (anuncio.unidades_vendidas, anuncio.estoque) == (7, 98)
+    confere_resumo()
+
+
+def test_importar_anuncios_recusa_preco_nao_finito_ou_negativo(app, semeado, tmp_path):
+    arquivo = tmp_path / "anuncios.csv"
+    arquivo.write_text("titulo,preco,usuario_id\nA,NaN,1\nB,inf,1\nC,-1,1\nD,\"2,50\",1\n")
+    with app.app_context():
+        resultado = ecommerce.importar_anuncios(str(arquivo))
+        assert resultado.inseridos == 1, str(resultado)
+        assert [motivo.split(":")[0] for _, motivo in resultado.erros] == ["preço inválido"] * 3
+
+
+def test_exportar_e_reimportar_usuarios(app, semeado, tmp_path):
+    with app.app_context():
+        assert ecommerce.exportar("compras", str(tmp_path / "compras.jsonl")) == 3
+        assert ecommerce.exportar("usuarios", str(tmp_path / "usuarios.csv")) == 2
+        db.session.execute(db.update(ecommerce.Usuario).values(email=ecommerce.Usuario.email + ".antigo"))
+        db.session.commit()
+    resultado = app.test_cli_runner().invoke(args=["import-usuarios", str(tmp_path / "usuarios.csv")])
+    assert "2 registros importados, 0 rejeitados." in resultado.output
+    linhas = (tmp_path / "compras.jsonl").read_text().splitlines()
+    assert [json.loads(l)["quantidade"] for l in linhas] == [2, 2, 2]
+    # o hash exportado entra como está: a senha original continua valendo
+    entrar(semeado, "Ana")
@@ -0,0 +1,44 @@
+def test_lista_em_streaming_conta_consultas_do_corpo(app, semeado):
+    app.config["METRICAS_CABECALHO"] = True
+    metricas = __import__("ecommerce").metricas
+    metricas._dados.clear()
+
+    resposta = semeado.get("/anuncios/compra", buffered=False)
+    assert resposta.is_streamed
+    assert "X-SQL-Queries" not in resposta.headers  # sairia antes das consultas do corpo
+    assert b"Livro 0" in resposta.get_data()
+    resposta.close()
+
+    registro = metricas._dados[("compra", "GET")]
+    assert registro.latencia.total == 1
+    # no mínimo o SELECT das compras, que só roda durante o streaming
+    assert registro.consultas.soma >= 1
+    assert registro.objetos >= 3
+
+
+def test_lista_sem_streaming_mantem_cabecalhos(app, semeado):
+    app.config.update(METRICAS_CABECALHO=True, LISTAS_STREAMING=False)
+    try:
+        resposta = semeado.get("/anuncios/compra")
+    finally:
+        app.config["LISTAS_STREAMING"] = True
+    assert int(resposta.headers["X-SQL-Queries"]) >= 1
+
+
+def test_metrics_no_formato_prometheus(app, semeado):
+    metricas = __import__("ecommerce").metricas
+    metricas._dados.clear()
+    semeado.get("/")
+
+    texto = semeado.get("/metrics").get_data(as_text=True)
+    assert "# TYPE ecommerce_http_request_duration_seconds histogram" in texto
+    assert 'ecommerce_http_request_duration_seconds_count{endpoint="index",method="GET"} 1' in texto
+    assert 'ecommerce_sql_queries_per_request_bucket{endpoint="index",method="GET",le="+Inf"} 1' in texto
+    assert 'ecommerce_orm_objects_loaded_total{endpoint="index",method="GET"}' in texto
+
+
+def test_aviso_acima_do_limite_de_consultas(app, semeado, monkeypatch, caplog):
+    monkeypatch.setitem(app.config, "METRICAS_LIMITE_CONSULTAS", 0)
+    with caplog.at_level("WARNING", logger="metricas"):
+        semeado.get("/api/v1/anuncios/1")
+    assert "GET /api/v1/anuncios/1 emitiu" in caplog.text
@@ -0,0 +1,80 @@
+from sqlalchemy import inspect
+
+import ecommerce
+from ecommerce import Anuncio, Compra, Pergunta, db, migrar_banco, registrar_compra
+
+# esquema de um banco criado antes das colunas de contadores, caixa do
+# vendedor, exclusão lógica etc. (com a chave de idempotência ainda global)
+ESQUEMA_ANTIGO = """
+CREATE TABLE usuario (id INTEGER NOT NULL, nome VARCHAR(120) NOT NULL, email VARCHAR(120) NOT NULL,
+    senha VARCHAR(255) NOT NULL, criado_em DATETIME DEFAULT (CURRENT_TIMESTAMP),
+    PRIMARY KEY (id), UNIQUE (email));
+CREATE TABLE categoria (id INTEGER NOT NULL, nome VARCHAR(100) NOT NULL, PRIMARY KEY (id), UNIQUE (nome));
+CREATE TABLE anuncio (id INTEGER NOT NULL, titulo VARCHAR(150) NOT NULL, descricao TEXT,
+    preco NUMERIC(10, 2) NOT NULL, categoria_id INTEGER NOT NULL, usuario_id INTEGER NOT NULL,
+    criado_em DATETIME DEFAULT (CURRENT_TIMESTAMP), PRIMARY KEY (id),
+    FOREIGN KEY(categoria_id) REFERENCES categoria (id), FOREIGN KEY(usuario_id) REFERENCES usuario (id));
+CREATE INDEX ix_anuncio_categoria_id ON anuncio (categoria_id);
+CREATE INDEX ix_anuncio_usuario_id ON anuncio (usuario_id);
+CREATE TABLE compra (id INTEGER NOT NULL, usuario_id INTEGER NOT NULL, anuncio_id INTEGER NOT NULL,
+    quantidade INTEGER NOT NULL, total NUMERIC(10, 2) NOT NULL, criado_em DATETIME DEFAULT (CURRENT_TIMESTAMP),
+    chave_idempotencia VARCHAR(64), PRIMARY KEY (id), UNIQUE (chave_idempotencia),
+    FOREIGN KEY(usuario_id) REFERENCES usuario (id), FOREIGN KEY(anuncio_id) REFERENCES anuncio (id));
+CREATE INDEX ix_compra_usuario_id ON compra (usuario_id);
+CREATE INDEX ix_compra_anuncio_id ON compra (anuncio_id);
+CREATE TABLE pergunta (id INTEGER NOT NULL, anuncio_id INTEGER NOT NULL, usuario_id INTEGER NOT NULL,
+    texto TEXT NOT NULL, resposta TEXT, criado_em DATETIME DEFAULT (CURRENT_TIMESTAMP), PRIMARY KEY (id),
+    FOREIGN KEY(anuncio_id) REFERENCES anuncio (id), FOREIGN KEY(usuario_id) REFERENCES usuario (id));
+CREATE INDEX ix_pergunta_usuario_id ON pergunta (usuario_id);
+CREATE INDEX ix_pergunta_anuncio_id ON pergunta (anuncio_id);
+
+INSERT INTO usuario (id, nome, email, senha) VALUES (1, 'Ana', 'ana@x', 'x'), (2, 'Bia', 'bia@x', 'x');
+INSERT INTO categoria (id, nome) VALUES (1, 'Livros');
+INSERT INTO anuncio (id, titulo, preco, categoria_id, usuario_id) VALUES (1, 'Livro', 10, 1, 1), (2, 'Jogo', 30, 1, 2);
+INSERT INTO compra (usuario_id, anuncio_id, quantidade, total, chave_idempotencia)
+    VALUES (2, 1, 2, 20, 'k1'), (1, 2, 1, 30, NULL);
+INSERT INTO pergunta (anuncio_id, usuario_id, texto, resposta)
+    VALUES (1, 2, 'tem?', NULL), (1, 2, 'novo?', 'sim'), (2, 1, 'cor?', NULL);
+"""
+
+
+def _banco_antigo(app):
+    with app.app_context():
+        db.drop_all()
+        conexao = db.engine.raw_connection()
+        conexao.executescript(ESQUEMA_ANTIGO)
+        conexao.close()
+
+
+def test_migrar_banco_antigo(app, cliente, confere_resumo):
+    _banco_antigo(app)
+    with app.app_context():
+        relatorio = migrar_banco()
+        assert "resumo_venda" in relatorio["tabelas"]
+        assert {"pergunta.vendedor_id", "pergunta.respondida"} <= set(relatorio["preenchidas"])
+        assert relatorio["unicas_removidas"]
+        assert set(relatorio["indices_removidos"]) == {"ix_anuncio_categoria_id", "ix_pergunta_anuncio_id"}
+        assert "ix_usuario_nome_prefixo" in relatorio["indices"]
+
+        assert [(p.vendedor_id, p.respondida) for p in Pergunta.query.order_by(Pergunta.id)] == \
+            [(1, False), (1, True), (2, False)]
+        a = db.session.get(Anuncio, 1)
+        assert (a.qtd_perguntas, a.qtd_sem_resposta, a.unidades_vendidas) == (2, 1, 2)
+        assert Compra.query.count() == 2
+
+        # a chave agora vale por usuário
+        assert registrar_compra(1, 1, 1, "k1")[1]
+        assert registrar_compra(1, 2, 1, "k1")[1] is False
+        assert {"uq_compra_chave", "ix_pergunta_caixa"} <= {
+            i["name"] for t in ("compra", "pergunta") for i in inspect(db.engine).get_indexes(t)
+        } | {u["name"] for u in inspect(db.engine).get_unique_constraints("compra")}
+
+        # rodar de novo não muda nada
+        segunda = migrar_banco()
+        assert not any(segunda[chave] for chave in ("tabelas", "colunas", "indices", "indices_removidos",
+                                                    "unicas_removidas"))
+        assert segunda["contadores"][1] == 0
+    confere_resumo()
+    with cliente.session_transaction() as sessao:
+        sessao["usuario_id"] = 1
+    assert b"tem?" in cliente.get("/vendedor/1/perguntas").data
@@ -0,0 +1,44 @@
+import re
+
+import pytest
+
+LINK_PROXIMA = re.compile(r'href="([^"]+)">Próxima página')
+
+
+def percorrer(cliente, url):
+    """Segue "Próxima página" até o fim; devolve o HTML de cada página."""
+    paginas = []
+    while url:
+        html = cliente.get(url).get_data(as_text=True)
+        paginas.append(html)
+        proxima = LINK_PROXIMA.search(html)
+        url = proxima and proxima.group(1).replace("&amp;", "&")
+    return paginas
+
+
+@pytest.mark.parametrize("streaming", [True, False])
+def test_anuncios_percorre_todas_as_paginas(app, semeado, monkeypatch, streaming):
+    monkeypatch.setitem(app.config, "LISTAS_STREAMING", streaming)
+    paginas = percorrer(semeado, "/cad/anuncios?limit=1")
+    assert len(paginas) == 3
+    # mais recentes primeiro, um por página, sem repetir
+    assert [re.findall(r"Livro \d", html)[0] for html in paginas] == ["Livro 2", "Livro 1", "Livro 0"]
+
+
+def test_limite_invalido_usa_padrao(app, semeado):
+    html = semeado.get("/cad/anuncios?limit=abc&after=xyz").get_data(as_text=True)
+    assert all(f"Livro {i}" in html for i in range(3))
+    assert not LINK_PROXIMA.search(html)
+
+
+def test_compras_nao_consultam_por_linha(app, semeado, monkeypatch):
+    monkeypatch.setitem(app.config, "METRICAS_CABECALHO", True)
+    monkeypatch.setitem(app.config, "LISTAS_STREAMING", False)
+
+    def consultas():
+        return int(semeado.get("/anuncios/compra").headers["X-SQL-Queries"])
+
+    antes = consultas()
+    for _ in range(5):
+        semeado.post("/anuncios/compra", data={"anuncio_id": "1", "quantidade": "1"})
+    assert consultas() == antes
@@ -0,0 +1,26 @@
+from conftest import entrar
+
+import ecommerce
+from ecommerce import db
+
+
+def test_caixa_so_do_proprio_vendedor(app, semeado):
+    semeado.post("/anuncios/pergunta", data={"anuncio_id": "1", "texto": "Tem capa dura?"})
+    with app.app_context():
+        pergunta = ecommerce.Pergunta.query.one()
+        assert (pergunta.usuario_id, pergunta.vendedor_id) == (2, 1)
+
+    # Bia (logada) não é a vendedora
+    assert semeado.get("/vendedor/1/perguntas").status_code == 403
+    assert semeado.post("/vendedor/1/perguntas", data={f"resposta-{pergunta.id}": "Não"}).status_code == 403
+    anonimo = app.test_client()
+    assert anonimo.get("/vendedor/1/perguntas").headers["Location"].endswith("/login")
+    with app.app_context():
+        assert not db.session.get(ecommerce.Pergunta, pergunta.id).respondida
+
+    entrar(semeado, "Ana")
+    assert b"Tem capa dura?" in semeado.get("/vendedor/1/perguntas").data
+    semeado.post("/vendedor/1/perguntas", data={f"resposta-{pergunta.id}": "Sim"})
+    with app.app_context():
+        assert db.session.get(ecommerce.Pergunta, pergunta.id).resposta == "Sim"
+        assert db.session.get(ecommerce.Anuncio, 1).qtd_sem_resposta == 0
@@ -0,0 +1,24 @@
+import ecommerce
+from ecommerce import db
+
+
+def test_editar_categoria_e_dono_move_as_vendas(app, semeado, confere_resumo):
+    semeado.post("/anuncio/editar/1", data={"nome": "Livro 0", "desc": "bom", "preco": "10,50",
+                                             "cat": "2", "uso": "2"})
+    resumo = confere_resumo()
+    assert ("categoria", "dia", 2) in {linha[:3] for linha in resumo}
+    assert ("vendedor", "dia", 2) in {linha[:3] for linha in resumo}
+
+    # voltar e excluir não deixa baldes negativos
+    semeado.post("/anuncio/editar/1", data={"nome": "Livro 0", "desc": "bom", "preco": "10,50",
+                                             "cat": "1", "uso": "1"})
+    semeado.post("/anuncio/deletar/1")
+    confere_resumo()
+
+
+def test_patch_da_api_move_as_vendas(app, semeado, confere_resumo):
+    resposta = semeado.patch("/api/v1/anuncios", json=[{"id": 2, "categoria_id": 2}])
+    assert resposta.status_code == 200, resposta.get_json()
+    confere_resumo()
+    with app.app_context():
+        assert db.session.get(ecommerce.Anuncio, 2).categoria_id == 2
@@ -0,0 +1,77 @@
+import time
+
+import pytest
+
+import ecommerce
+from replicas import COOKIE, ReplicadorFalso
+
+
+@pytest.fixture
+def com_replica(app, semeado, tmp_path, monkeypatch):
+    """Uma réplica em outro arquivo SQLite; a vigia não roda sozinha, o teste chama checar()."""
+    primario = app.config["SQLALCHEMY_DATABASE_URI"]
+    url = f"sqlite:///{tmp_path / 'replica.db'}"
+    for chave, valor in {"REPLICAS_URLS": [url], "REPLICAS_INTERVALO": 0.0, "REPLICAS_ATRASO_MAX": 60.0,
+                         "REPLICAS_FALHAS": 1, "REPLICAS_REPLICADOR_FALSO": False}.items():
+        monkeypatch.setitem(app.config, chave, valor)
+    replicas = ecommerce.replicas
+    monkeypatch.setattr(replicas, "_vigiar", lambda: None)
+    monkeypatch.setattr(replicas, "_pid", None)
+    replicador = ReplicadorFalso(primario, [url])
+    with app.app_context():
+        replicas.iniciar()
+        replicas.checar()  # batimento no primário...
+        replicador.copiar()  # ...chega à réplica
+        replicas.checar()
+    # marca a réplica para saber de onde veio a leitura
+    replica = replicas._replicas[0]
+    with replica.engine.begin() as conn:
+        conn.exec_driver_sql("UPDATE categoria SET nome = 'Livros (réplica)' WHERE id = 1")
+    yield replicas, replica, replicador
+    replicas.encerrar()
+    replica.engine.dispose()
+    replicas._replicas = []
+
+
+def _le_replica(cliente):
+    return b"Livros (r\xc3\xa9plica)" in cliente.get("/config/categoria").data
+
+
+def test_leitura_vai_para_a_replica_e_volta_ao_primario_depois_de_escrever(app, com_replica):
+    _, replica, _ = com_replica
+    assert replica.saudavel
+    anonimo = app.test_client()
+    assert _le_replica(anonimo)
+
+    resposta = anonimo.post("/config/categoria", data={"nome": "Jornais"})
+    assert COOKIE in resposta.headers.get("Set-Cookie", "")
+    pagina = anonimo.get("/config/categoria").data
+    assert b"Jornais" in pagina and b"(r\xc3\xa9plica)" not in pagina  # o redirect do POST lê do primário
+
+    assert _le_replica(app.test_client())  # quem não escreveu continua na réplica
+
+
+def test_replica_atrasada_sai_do_rodizio(app, com_replica, monkeypatch):
+    replicas, replica, replicador = com_replica
+    monkeypatch.setitem(app.config, "REPLICAS_ATRASO_MAX", 0.05)
+    time.sleep(0.1)
+    with app.app_context():
+        replicas.checar()  # a réplica não recebeu o batimento novo
+    assert not replica.saudavel and replica.atraso > 0.05
+    assert not _le_replica(app.test_client())
+
+    with app.app_context():
+        replicador.copiar()
+        replicas.checar()
+    assert replica.saudavel
+
+
+def test_replica_fora_do_ar_sai_do_rodizio(app, com_replica, tmp_path):
+    replicas, replica, _ = com_replica
+    replica.engine.dispose()
+    (tmp_path / "replica.db").write_bytes(b"isto nao e um banco sqlite" * 100)
+    with app.app_context():
+        replicas.checar()
+    assert not replica.saudavel and replica.erro
+    assert not _le_replica(app.test_client())
+    assert app.test_client().get("/config/categoria").status_code == 200
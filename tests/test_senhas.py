@@ -0,0 +1,67 @@
+import threading
+
+import pytest
+from flask import Flask
+from werkzeug.security import check_password_hash
+
+import ecommerce
+from senhas import Senhas, SenhasOcupadas
+
+
+def _senhas(**config):
+    app = Flask(__name__)
+    app.config.update(SENHA_ITERACOES=1000, SENHA_POOL="thread", SENHA_TRABALHADORES=2,
+                      SENHA_FILA=0, SENHA_ESPERA=0.2, **config)
+    return Senhas(app)
+
+
+def test_gerar_varios_passa_pela_admissao():
+    senhas = _senhas()
+    liberar = threading.Event()
+    ocupadas = [senhas._submeter(liberar.wait) for _ in range(2)]  # pool e fila cheios
+    try:
+        with pytest.raises(SenhasOcupadas):
+            senhas.gerar_varios(["a", "b"])
+    finally:
+        liberar.set()
+    for futuro in ocupadas:
+        futuro.result()
+
+
+def test_gerar_varios_devolve_na_ordem():
+    lista = [f"senha{n}" for n in range(7)]
+    hashes = _senhas().gerar_varios(lista)
+    assert all(check_password_hash(h, s) for h, s in zip(hashes, lista))
+
+
+def test_login_preserva_tarefas_da_sessao(app, semeado):
+    with semeado.session_transaction() as sessao:
+        sessao["tarefas"] = [42]
+        sessao["outra_coisa"] = 1
+    semeado.post("/login", data={"email": "ana@x", "passwd": "123456"})
+    with semeado.session_transaction() as sessao:
+        assert sessao["tarefas"] == [42]
+        assert sessao["usuario_id"] == 1
+        assert "outra_coisa" not in sessao
+
+
+def test_compra_usa_o_usuario_logado(app, semeado):
+    semeado.post("/anuncios/compra", data={"anuncio_id": "1", "usuario_id": "1", "quantidade": "1"})
+    with app.app_context():
+        assert ecommerce.Compra.query.order_by(ecommerce.Compra.id.desc()).first().usuario_id == 2  # Bia
+
+    semeado.post("/logout")
+    resposta = semeado.post("/anuncios/compra", data={"anuncio_id": "1", "quantidade": "1"})
+    assert resposta.headers["Location"].endswith("/login")
+    with app.app_context():
+        assert ecommerce.Compra.query.count() == 4
+
+
+def test_pagina_de_quem_entrou_nao_vai_para_o_cache(app, semeado):
+    app.config["CACHE_PAGINAS"] = True
+    anonimo = app.test_client()
+    assert "Entrar</a>" in anonimo.get("/cad/anuncios").get_data(as_text=True)
+    pagina = semeado.get("/cad/anuncios")
+    assert "Bia · Sair" in pagina.get_data(as_text=True)
+    assert pagina.headers["Cache-Control"] == "private, no-store"
+    assert "Bia" not in anonimo.get("/cad/anuncios").get_data(as_text=True)
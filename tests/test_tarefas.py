@@ -0,0 +1,71 @@
+import threading
+from datetime import datetime, timedelta
+
+from ecommerce import Tarefa, db, fila
+from tarefas import FilaTarefas
+
+
+def _outro_worker(app):
+    """Segunda fila sobre a mesma tabela, como a de outro processo."""
+    outra = FilaTarefas(app, db, Tarefa)
+    outra._funcoes = fila._funcoes
+    return outra
+
+
+def _envelhecer(tarefa_id, segundos):
+    antes = datetime.now() - timedelta(seconds=segundos)
+    Tarefa.query.filter_by(id=tarefa_id).update({"iniciado_em": antes, "renovado_em": antes})
+    db.session.commit()
+
+
+def test_tarefa_em_execucao_renova_o_lease(app, monkeypatch):
+    rodando, liberar = threading.Event(), threading.Event()
+
+    @fila.tarefa("lenta")
+    def lenta(progresso):
+        rodando.set()
+        liberar.wait(10)
+        return "ok"
+
+    lease = app.config["TAREFAS_LEASE"]
+    with app.app_context():
+        tarefa_id = fila.enfileirar("lenta", tentativas=3)
+        assert fila._reservar() == tarefa_id
+
+    def executar():
+        with app.app_context():
+            fila._executar(tarefa_id)
+            db.session.remove()
+    t = threading.Thread(target=executar)
+    t.start()
+    try:
+        assert rodando.wait(10)
+        with app.app_context():
+            _envelhecer(tarefa_id, lease + 60)
+            fila._renovar()  # o que a thread tarefas-lease faz a cada LEASE/3
+            assert _outro_worker(app)._reservar() is None
+    finally:
+        liberar.set()
+        t.join(10)
+        fila._funcoes.pop("lenta")
+    with app.app_context():
+        assert db.session.get(Tarefa, tarefa_id).status == "concluida"
+
+
+def test_lease_vencido_so_reexecuta_com_tentativas(app):
+    lease = app.config["TAREFAS_LEASE"]
+    with app.app_context():
+        ultima = fila.enfileirar("importar", tentativas=1, entidade="usuarios", caminho="/nao/existe")
+        repetivel = fila.enfileirar("rebuild-relatorios", tentativas=2)
+        assert fila._reservar() == ultima
+        assert fila._reservar() == repetivel
+        # o worker morreu: ninguém renova
+        _envelhecer(ultima, lease + 60)
+        _envelhecer(repetivel, lease + 60)
+
+        outro = _outro_worker(app)
+        assert outro._reservar() == repetivel
+        assert outro._reservar() is None
+        db.session.expire_all()
+        assert db.session.get(Tarefa, ultima).status == "falhou"
+        assert db.session.get(Tarefa, repetivel).tentativas == 2